@@ -3,21 +3,26 @@ Defines certain classes used to store networks and enumerate some of the routes
 '''
 
 from os import path
+from itertools import permutations
 import numpy as np
-from numpy.core.numeric import count_nonzero
 import pandas as pd
-from pulp.apis.core import initialize
-from createBitStrings import *
+from scipy import sparse
 
 class AdjacencyMatrix(object):
     '''
-    Generic superclass to represent graphs as adjacency matrices
+    Generic superclass to represent graphs as adjacency matrices. The matrix is stored sparse (scipy CSR format) as most pairs
+    of nodes are not adjacent, and is only made dense when asked for through the matrix property
     '''
     def __init__(self, name, numNodes, nodeNames):
         self.name = name
-        self.matrix = np.zeros((numNodes, numNodes))
+        self.numNodes = numNodes
+        self.adjacency = sparse.csr_matrix((numNodes, numNodes))
         self.nodeNames = nodeNames
 
+    @property
+    def matrix(self):
+        return self.adjacency.toarray()
+
     def __repr__(self):
         return "{}: \n {}".format(self.name, self.matrix)
 
@@ -38,69 +43,114 @@ class NetworkByAdjacencyMatrix(AdjacencyMatrix):
         method to create the networks adjacencies by linking nodes to at least their nearest k neighbors, while the distribution center has connections to all nodes
 
         Inputs:
-            travelDF - pandas dataframe of travel times between nodes in the network
+            travelDF - pandas dataframe or numpy array of travel times between nodes in the network
             distributionIndex - index of the distribution center in the dataframe
             k - minimum number of connection for a node to have
         '''
-        arr = travelDF.to_numpy()
+        arr = np.asarray(travelDF)
+        numNodes = self.numNodes
 
-        # loops through nodes
-        for i in range(len(self.matrix)):
+        # finds the nearest k nodes to every node (usually including the node itself) with one partial sort over all the rows
+        nearest = np.argpartition(arr, k, axis = 1)[:, :k]
 
-            # checks if node is the distribution center. If so adds connections to all other nodes
-            if i == distributionIndex:
-                self.matrix[i, :] = 1
-                self.matrix[:, i] = 1
-                self.matrix[i, i] = 0
-            
-            # if not the distribution center, adds connections to the nearest k other nodes
-            else:
-                smallest_k_indices = np.argpartition(arr[i, :], k)
-                self.matrix[i, smallest_k_indices[:k]] = 1
-                self.matrix[smallest_k_indices[:k], i] = 1
-                self.matrix[i, i] = 0
+        # links each node to its nearest nodes, and the distribution center to all other nodes. Links from a node to itself are dropped
+        rows = np.concatenate((np.repeat(np.arange(numNodes), k), np.full(numNodes, distributionIndex)))
+        cols = np.concatenate((nearest.ravel(), np.arange(numNodes)))
+        notLoop = rows != cols
+        links = sparse.csr_matrix((np.ones(notLoop.sum()), (rows[notLoop], cols[notLoop])), shape = (numNodes, numNodes))
+
+        # makes the links go both ways, with every entry 1 even where a link was added twice
+        self.adjacency = (links + links.T).tocsr()
+        self.adjacency.data[:] = 1
 
+        self.indexEdges()
         self.spanningTree = NetworkSpanningTree(self)
 
+    def indexEdges(self):
+        '''
+        Numbers the edges in the upper triangle of the network's adjacency matrix so that cycles and routes can be stored as
+        bitsets (python integers) over those edges. Bit b of a bitset is set if edge self.edgeList[b] is used.
+        Also stores, for each node, a mask of the bits of the edges that touch it and a sorted list of its neighbours.
+        '''
+        upper = sparse.triu(self.adjacency, 1).tocoo()
+        order = np.lexsort((upper.col, upper.row))
+        self.edgeList = list(zip(upper.row[order].tolist(), upper.col[order].tolist()))
+        self.edgeIndex = {edge: bit for bit, edge in enumerate(self.edgeList)}
+        self.nodeEdgeMasks = [0] * self.numNodes
+        self.neighbours = [[] for node in range(self.numNodes)]
+        for bit, (i, j) in enumerate(self.edgeList):
+            self.nodeEdgeMasks[i] |= 1 << bit
+            self.nodeEdgeMasks[j] |= 1 << bit
+            self.neighbours[i].append(j)
+            self.neighbours[j].append(i)
+        for nodeNeighbours in self.neighbours:
+            nodeNeighbours.sort()
+
+    def edgeBit(self, i, j):
+        '''
+        Returns the bitset containing only the edge between nodes i and j
+        '''
+        return 1 << self.edgeIndex[(min(i, j), max(i, j))]
+
+    def matrixToEdges(self, matrix):
+        '''
+        Converts an adjacency matrix (using only edges of this network) into an edge bitset
+        '''
+        edges = 0
+        rows, cols = np.nonzero(np.triu(matrix, 1))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            edges |= 1 << self.edgeIndex[(i, j)]
+        return edges
+
+    def edgePairs(self, edges):
+        '''
+        Returns the list of (i, j) node pairs, with i < j, of the edges in an edge bitset
+        '''
+        pairs = []
+        bit = 0
+        while edges:
+            if edges & 1:
+                pairs.append(self.edgeList[bit])
+            edges >>= 1
+            bit += 1
+        return pairs
+
+    def edgesToMatrix(self, edges):
+        '''
+        Converts an edge bitset back into a symmetric integer adjacency matrix
+        '''
+        matrix = np.zeros((self.numNodes, self.numNodes), dtype=int)
+        for i, j in self.edgePairs(edges):
+            matrix[i, j] = 1
+            matrix[j, i] = 1
+        return matrix
+
+    def nodeDegrees(self, edges):
+        '''
+        Returns a list of the degree of every node in the network for the edges in an edge bitset
+        '''
+        return [countBits(edges & mask) for mask in self.nodeEdgeMasks]
+
+    def nodeBits(self, edges):
+        '''
+        Returns a bitmask of the nodes touched by the edges in an edge bitset (bit v is set if node v is used)
+        '''
+        nodes = 0
+        for node in range(len(self.nodeEdgeMasks)):
+            if edges & self.nodeEdgeMasks[node]:
+                nodes |= 1 << node
+        return nodes
+
     def findTreePath(self, finalNode):
         '''
-        Finds the path to a certain node along the spanning tree using Breadth-First Search (Faster because tree was created using Depth-First Search)
-        For use in the findFundamentalCycles method
+        Finds the path to a certain node along the spanning tree by following the tree's parent array up to node 0
 
         Inputs:
             finalNode - index of node being searched
         Outputs:
             pathMatrix - adjacency matrix of path from node 0 to finalNode along the spanning tree
         '''
-
-        # Initializing return
-        pathMatrix = np.zeros((len(self.matrix), len(self.matrix)))
-
-        # Checks if start node is node being searched for. If true, immediately returns
-        if finalNode == 0:
-            return pathMatrix
-
-        # Implementation of BFS to find the path
-        stack = [0]
-        parents = [None] * len(self.matrix)
-        visited = [False] * len(self.matrix)
-        visited[0] = True
-        while stack:
-            currentNode = stack[0]
-            stack.pop(0)
-            for i in range(len(self.matrix)):
-                if self.spanningTree.matrix[currentNode, i] == 1 and not visited[i]:
-                    stack.append(i)
-                    parents[i] = currentNode
-                    visited[i] = True
-
-                    # If node being searched for is found, goes back from parent to parent, plotting the path then returning that matrix
-                    if i == finalNode:
-                        while parents[i] != None:
-                            pathMatrix[i,parents[i]] = 1
-                            pathMatrix[parents[i], i] = 1
-                            i = parents[i]
-                        return pathMatrix
+        return self.edgesToMatrix(self.spanningTree.pathEdges(0, finalNode))
 
     def findFundamentalCycles(self):
         '''
@@ -110,173 +160,310 @@ class NetworkByAdjacencyMatrix(AdjacencyMatrix):
         # Initializing return
         fundCycles = []
 
-        # Finds set of arcs not in the spanning tree
-        nonTreeArcs = self.matrix - self.spanningTree.matrix
-
-        # loops through each pair of nodes using nested loops
-        for i in range(len(nonTreeArcs)):
-            for j in range(i, len(nonTreeArcs)):
-
-                # If an arc not in the spanning tree is found between the pair of nodes, finds the paths along the tree to each of those nodes, adds the arc not in the spanning tree,
-                # then performs an XOR operation between the 2 paths to output the fundamental cycle
-                if nonTreeArcs[i, j] == 1:
-                    pathi = self.findTreePath(i)
-                    pathi[i,j] = 1
-                    pathi[j,i] = 1
-                    pathj = self.findTreePath(j)
-                    cycleMatrix = 1*np.logical_xor(pathi, pathj)
-                    fundCycles.append(Cycle(self, "Fundamental Cycle" + str(len(fundCycles)), cycleMatrix))
+        # loops through the arcs in the network, in the same order as the upper triangle of the adjacency matrix.
+        # Each arc not in the spanning tree forms a cycle with the tree path between its two nodes, which is found by walking up
+        # from both nodes to their lowest common ancestor
+        for bit, (i, j) in enumerate(self.edgeList):
+            if not self.spanningTree.edges >> bit & 1:
+                cycleEdges = self.spanningTree.pathEdges(i, j) | 1 << bit
+                fundCycles.append(Cycle(self, "Fundamental Cycle" + str(len(fundCycles)), cycleEdges))
 
         # Sets objects set of fundamental cycles to the set found
         self.fundamentalCycles = fundCycles
 
+    def iterateRoutes(self, maxNodes = 5):
+        '''
+        Generator which walks the combinations of fundamental cycles depth first (in cycle order, trying to include each cycle
+        before leaving it out) and yields the edge bitset of each valid route. Each step of the walk applies one XOR, and a
+        branch is cut as soon as:
+            - the next cycle shares no edges with the route built so far (it can't be included),
+            - more than maxNodes nodes are fixed in the route, or a fixed node has degree above 2. A node is fixed if it is
+              the end of one of the route's non-tree edges (each fundamental cycle adds one, and no other cycle removes it)
+              or once none of the remaining cycles touch it, as only those cycles could still remove it or change its degree,
+            - the distribution centre is not in the route and none of the remaining cycles touch it.
+        Only a stack of pending branches is kept, so memory stays bounded by the number of fundamental cycles and the work
+        done grows with the number of feasible routes rather than with every combination of cycles.
+
+        Inputs:
+            maxNodes - maximum number of distinct nodes (including the distribution center) in a route
+        Outputs:
+            yields edge bitsets of routes, each only once
+        '''
+        distrIndex = self.nodeNames.index("Distribution Centre Auckland")
+        distrBit = 1 << distrIndex
+        cycleEdges = [cycle.edges for cycle in self.fundamentalCycles]
+        numCycles = len(cycleEdges)
+
+        # laterNodes[i] is the set of nodes (as a bitmask) touched by any of the cycles from i onwards
+        laterNodes = [0] * (numCycles + 1)
+        for i in range(numCycles - 1, -1, -1):
+            laterNodes[i] = laterNodes[i + 1] | self.nodeBits(cycleEdges[i])
+
+        # each fundamental cycle has exactly one edge not in the spanning tree, so these edges are never removed by a later XOR
+        nonTreeEdges = ((1 << len(self.edgeList)) - 1) & ~self.spanningTree.edges
+
+        # each entry is the index of the next cycle to decide on and the route built so far
+        stack = [(0, 0)]
+        while stack:
+            i, route = stack.pop()
+
+            if route:
+                # checks the nodes which can no longer leave the route: the ends of its non-tree edges and any node none of the
+                # remaining cycles touch, whose degree can no longer change either. Once all cycles are decided on every node is fixed
+                degrees = self.nodeDegrees(route)
+                settledNodes = [node for node in range(len(degrees)) if degrees[node] != 0 and not laterNodes[i] >> node & 1]
+                if any(degrees[node] > 2 for node in settledNodes):
+                    continue
+                fixedNodes = self.nodeBits(route & nonTreeEdges)
+                for node in settledNodes:
+                    fixedNodes |= 1 << node
+                if countBits(fixedNodes) > maxNodes:
+                    continue
+                if i == numCycles:
+                    if degrees[distrIndex] != 0:
+                        yield route
+                    continue
+                if degrees[distrIndex] == 0 and not laterNodes[i] & distrBit:
+                    continue
+            elif i == numCycles or not laterNodes[i] & distrBit:
+                continue
+
+            # leaves cycle i out of the route
+            stack.append((i + 1, route))
+
+            # adds cycle i to the route if it is the first cycle or shares an edge with the route. Pushed last so it is tried first
+            if not route or route & cycleEdges[i]:
+                stack.append((i + 1, route ^ cycleEdges[i]))
+
     def enumerateRoutes(self):
         '''
         Finds combinations of valid routes given certain conditions by combining the set of fundamental routes in all possible ways
+        (see iterateRoutes), then adds the direct routes to and from each store
         '''
 
-        # generate array of combinations
-        # first generates all bitstrings length of the fundamentalCycles - 1
-        bitstrings = []
-        n = len(self.fundamentalCycles) - 1
-        arr = [None] * n
-        bitstrings = generateBitStrings(bitstrings, n, arr, 0)
-        
-        # then checks if each fundamental cycle contains the distribution center and if so inserts a 1 at the index of that
-        # cycle for each possible combination formed above. This means that the combinations included will always include the 
-        # distribution center at least once.
-        bitstrings_final = []
-        for i in range(len(self.fundamentalCycles)):
-            if (self.fundamentalCycles[i].matrix[self.nodeNames.index("Distribution Centre Auckland"), :]).sum() != 0:
-                for bitstring in bitstrings[:]:
-                    b = bitstring.copy()
-                    b.insert(i, 1)
-                    bitstrings_final.append(b)
-
-                    # removes certain bitstrings to avoid repeats
-                    if i != len(bitstring) and bitstring[i] == 1:
-                        bitstrings.remove(bitstring)
-
         #initialize output list
         routes = []
 
-        # loops through bitstrings, checking if each combination is feasible by checking if each of the cycles has at least 1 arc in common. 
-        # if so, it performs XOR operations between each of the used cycles (the 1's in the bitstring)
-        for bitstring in bitstrings_final:
-            # route initialization
-            route = Cycle(self, "route"+str(len(routes)), np.zeros((len(self.nodeNames), len(self.nodeNames))))
-            routeStarted = False
-            broken = False
-            for i in range(len(bitstring)):
-                if bitstring[i] == 1:
-
-                    # checks if any fundamental cycles have been added yet.
-                    # If yes checks if new cycle to be added has any edges in common.
-                    if routeStarted:
-
-                        # If no edges in common, stops route from being finished and won't add it to final routes
-                        if route.cycleAND(self.fundamentalCycles[i]).sum() == 0:
-                            broken = True
-                            break
-                        # If one or more edges are shared, merges them using XOR
-                        else:
-                            route.cycleXOR(self.fundamentalCycles[i])
-                    # If its the first fundamental cycle to be added, skips the check for shared edges
-                    else:
-                        route.cycleXOR(self.fundamentalCycles[i])
-                        routeStarted = True
-            
-            # If its a valid route, adds it to the list
-            if not broken:
-                routeRowSum = np.sum(route.matrix, axis=1)
-                if len(np.where(routeRowSum > 0)[0]) <= 5 and len(np.where(routeRowSum > 2)[0]) == 0 and routeRowSum[self.nodeNames.index("Distribution Centre Auckland")] != 0:
-                    routes.append(route)
-        
+        for route in self.iterateRoutes():
+            routes.append(Cycle(self, "route"+str(len(routes)), route))
+
         # gets index of distribution center for use in direct route generation
         distrIndex = self.nodeNames.index("Distribution Centre Auckland")
 
         # loops through nodes apart from distribution center and creates direct routes to and from them to ensure feasibility
-        # these matrices have number 2 stored instead of 1 to represent 2x the distance so in the LP, won't have to handle the differently
-        for i in range(len(self.matrix)):
+        # these routes have a weight of 2 to represent 2x the distance so in the LP, won't have to handle the differently
+        for i in range(self.numNodes):
             if (i != distrIndex):
-                directRouteMatrix = np.zeros((len(self.nodeNames), len(self.nodeNames)))
-                directRouteMatrix[i, distrIndex] = 1
-                directRouteMatrix[distrIndex, i] = 1
-                route = Cycle(self, "route"+str(len(routes)), np.zeros((len(self.nodeNames), len(self.nodeNames))))
-                route.cycleXOR(directRouteMatrix)
-                route.matrix *= 2
-                routes.append(route)
+                routes.append(Cycle(self, "route"+str(len(routes)), self.edgeBit(i, distrIndex), weight = 2))
+
+        self.routes = routes
+
+    def enumerateCapacitatedRoutes(self, travelDF, distributionIndex, demands, maxStores = 4, maxPallets = 25, maxTime = 6 * 3600):
+        '''
+        Alternative to the fundamental cycle method (addAdjacencies_and_createSpanningTree, findFundamentalCycles, enumerateRoutes).
+        Lists every set of up to maxStores stores which can be delivered to within the pallet and time limits and creates the
+        quickest tour from the distribution center through each set. The network is made complete so any tour can be stored.
+
+        Sets of stores are built up one store at a time (in index order) and a set is not extended once its running demand
+        is over maxPallets or a lower bound on the time of any tour through it is over maxTime. The bound is the unloading time
+        plus, for the distribution center and every store in the set, half the sum of its two quickest travel times to other nodes.
+
+        Inputs:
+            travelDF - pandas dataframe or numpy array of travel times between nodes in the network
+            distributionIndex - index of the distribution center in the dataframe
+            demands - array of the pallet demand of each node, using the smallest demand of the days being planned for
+                      so that no route feasible on one of those days is left out
+            maxStores - maximum number of stores in a route
+            maxPallets - truck capacity in pallets
+            maxTime - maximum time for a route in seconds, including unloading (7.5 minutes per pallet)
+        '''
+        arr = np.asarray(travelDF)
+
+        # time of each arc as used in the LP, which averages the 2 directions
+        times = (arr + arr.T) / 2
+
+        self.adjacency = sparse.csr_matrix(1 - np.eye(self.numNodes))
+        self.indexEdges()
+
+        # lower bound on the travel time a tour spends at each node
+        sortedTimes = np.sort(times + np.diag(np.full(len(times), np.inf)), axis = 1)
+        nodeBound = (sortedTimes[:, 0] + sortedTimes[:, 1]) / 2
+
+        stores = [i for i in range(self.numNodes) if i != distributionIndex]
+
+        #initialize output list
+        routes = []
+
+        # each entry is the stores in the set so far, their total demand and the lower bound on the time of a tour through them
+        stack = [((), 0, nodeBound[distributionIndex])]
+        while stack:
+            storeSet, pallets, timeBound = stack.pop()
+
+            # finds the quickest tour for sets of 2 or more stores (sets of 1 are added as direct routes below)
+            if len(storeSet) > 1:
+                bestTour = None
+                bestTime = np.inf
+                for order in permutations(storeSet):
+                    # each tour and its reverse take the same time (the times are symmetric), so only one of them is checked
+                    if order[0] > order[-1]:
+                        continue
+                    tour = (distributionIndex,) + order + (distributionIndex,)
+                    tourTime = sum(times[tour[s], tour[s + 1]] for s in range(len(tour) - 1))
+                    if tourTime < bestTime:
+                        bestTour = tour
+                        bestTime = tourTime
+
+                if bestTime + pallets * 7.5 * 60 <= maxTime:
+                    edges = 0
+                    for s in range(len(bestTour) - 1):
+                        edges |= self.edgeBit(bestTour[s], bestTour[s + 1])
+                    routes.append(Cycle(self, "route"+str(len(routes)), edges))
+
+            if len(storeSet) == maxStores:
+                continue
+
+            # extends the set with each later store, unless the demand or time bound is already too high
+            start = stores.index(storeSet[-1]) + 1 if storeSet else 0
+            for store in reversed(stores[start:]):
+                newPallets = pallets + demands[store]
+                newBound = timeBound + nodeBound[store] + demands[store] * 7.5 * 60
+                if newPallets <= maxPallets and newBound <= maxTime:
+                    stack.append((storeSet + (store,), newPallets, newBound))
+
+        # creates direct routes to and from each store to ensure feasibility, as in enumerateRoutes
+        for i in stores:
+            routes.append(Cycle(self, "route"+str(len(routes)), self.edgeBit(i, distributionIndex), weight = 2))
 
         self.routes = routes
 
 class NetworkSpanningTree(AdjacencyMatrix):
     '''
-    Adjacency matrix representing the spanning tree of a network
+    Adjacency matrix representing the spanning tree of a network. Also stores the tree as parent and depth arrays (rooted at
+    node 0) and as an edge bitset of the network, so paths along the tree can be found without searching it
     '''
     def __init__(self, Network):
         '''
         Automatically creates the tree in class initialization
         '''
-        # saves a copy of the network adjacency matrix for itself
-        self.networkAdjacency = Network.matrix.copy()
-        super().__init__(Network.name + " Spanning Tree", len(self.networkAdjacency), Network.nodeNames)
+        self.network = Network
+        super().__init__(Network.name + " Spanning Tree", Network.numNodes, Network.nodeNames)
         self.createTree()
 
     def createTree(self):
         '''
-        creates the spanning tree using a standard Depth First Search, always starting at node 0
+        creates the spanning tree using a standard Depth First Search, always starting at node 0 and moving to the
+        lowest numbered unvisited neighbour first. Uses the network's neighbour lists, keeping a position in each list
+        so every arc is only looked at once
         '''
-        visited = [1] * len(self.networkAdjacency)
+        numNodes = self.numNodes
+        neighbours = self.network.neighbours
+        self.parent = [None] * numNodes
+        self.depth = [0] * numNodes
+        self.parentEdge = [0] * numNodes
+        self.edges = 0
+
+        visited = [False] * numNodes
+        nextNeighbour = [0] * numNodes
         stack = [0]
-        visited[0] = 0
-        while len(stack) > 0:
-            v = stack[0]
-            if np.sum(np.dot(self.networkAdjacency[v, :], visited)) == 0:
-                stack.pop(0)
+        visited[0] = True
+        while stack:
+            v = stack[-1]
+            while nextNeighbour[v] < len(neighbours[v]) and visited[neighbours[v][nextNeighbour[v]]]:
+                nextNeighbour[v] += 1
+            if nextNeighbour[v] == len(neighbours[v]):
+                stack.pop()
             else:
-                tempRow = self.networkAdjacency[v, :]
-                toAdd = True
-                while toAdd:
-                    if visited[np.where(tempRow == 1)[0][0]] == 0:
-                        tempRow[np.where(tempRow == 1)[0][0]] = 0
-                    else:
-                        v2 = np.where(tempRow == 1)[0][0]
-                        self.matrix[v,v2] = 1
-                        self.matrix[v2,v] = 1
-                        visited[v2] = 0
-                        stack.insert(0, v2)
-                        toAdd = False
+                v2 = neighbours[v][nextNeighbour[v]]
+                visited[v2] = True
+                self.parent[v2] = v
+                self.depth[v2] = self.depth[v] + 1
+                self.parentEdge[v2] = self.network.edgeBit(v, v2)
+                self.edges |= self.parentEdge[v2]
+                stack.append(v2)
+
+        # stores the tree's links between each node and its parent both ways
+        children = [v for v in range(numNodes) if self.parent[v] is not None]
+        parents = [self.parent[v] for v in children]
+        self.adjacency = sparse.csr_matrix((np.ones(2 * len(children)), (children + parents, parents + children)), shape = (numNodes, numNodes))
+
+    def pathEdges(self, i, j):
+        '''
+        Finds the path between 2 nodes along the tree by walking up from both of them to their lowest common ancestor
+
+        Inputs:
+            i, j - indices of the nodes at each end of the path
+        Outputs:
+            edges - edge bitset (of the network) of the path
+        '''
+        edges = 0
+        while self.depth[i] > self.depth[j]:
+            edges ^= self.parentEdge[i]
+            i = self.parent[i]
+        while self.depth[j] > self.depth[i]:
+            edges ^= self.parentEdge[j]
+            j = self.parent[j]
+        while i != j:
+            edges ^= self.parentEdge[i] ^ self.parentEdge[j]
+            i = self.parent[i]
+            j = self.parent[j]
+        return edges
 
 
 class Cycle(AdjacencyMatrix):
     '''
-    Adjacency Matrix representing a regular cycle
+    Cycle (or route) in a network, stored as a bitset over the network's edges rather than as a dense adjacency matrix.
+    The adjacency matrix is only built when asked for, eg. when the route is written to file
     '''
-    def __init__(self, Network, nameExt, matrix):
-        self.networkAdjacency = Network.matrix.copy()
-        super().__init__(Network.name + " " + nameExt, len(Network.matrix), Network.nodeNames)
-        self.matrix = matrix.copy()
+    def __init__(self, Network, nameExt, edges = 0, weight = 1):
+        '''
+        Inputs:
+            Network - network the cycle belongs to
+            nameExt - name of the cycle, appended to the name of the network
+            edges - edge bitset of the cycle (see NetworkByAdjacencyMatrix.indexEdges), or an adjacency matrix to convert
+            weight - value stored for each edge when converted back to a matrix (2 for direct routes to and from a store)
+        '''
+        self.name = Network.name + " " + nameExt
+        self.nodeNames = Network.nodeNames
+        self.network = Network
+        self.weight = weight
+        if isinstance(edges, np.ndarray):
+            edges = Network.matrixToEdges(edges)
+        self.edges = edges
+
+    @property
+    def matrix(self):
+        return self.weight * self.network.edgesToMatrix(self.edges)
 
     def cycleXOR(self, other):
         '''
-        merges itself with another cycle using an XOR of their adjacency matrices
+        merges itself with another cycle using an XOR of their edge bitsets
         
         Inputs:
-            other - another adjacency matrix to merge with (of same size)
+            other - another cycle, edge bitset or adjacency matrix (of same size) to merge with
         '''
-        if isinstance(other, AdjacencyMatrix):
-            self.matrix = 1 * np.logical_xor(self.matrix, other.matrix)
+        if isinstance(other, Cycle):
+            self.edges ^= other.edges
         elif isinstance(other, np.ndarray):
-            self.matrix = 1 * np.logical_xor(self.matrix, other)
-
+            self.edges ^= self.network.matrixToEdges(other)
+        else:
+            self.edges ^= other
 
     def cycleAND(self, other):
         '''
-        checks if this cycle shares any edges with another adjacency matrix using AND
+        checks if this cycle shares any edges with another cycle using AND
         
         Inputs:
-            other - another adjacency matrix structure to merge with (of same size)
+            other - another cycle or edge bitset
+        Outputs:
+            bitset of the shared edges, which is 0 if no edges are shared
         '''
-        return 1 * np.logical_and(self.matrix, other.matrix) 
+        if isinstance(other, Cycle):
+            return self.edges & other.edges
+        return self.edges & other
+
 
-    
\ No newline at end of file
+def countBits(x):
+    '''
+    Returns the number of set bits in a non-negative integer
+    '''
+    return bin(x).count("1")
@@ -0,0 +1,35 @@
+'''
+Compares the runtime and catalog size of the route generation engines in createRoutes.py for each region
+
+Run with the same working directory as createRoutes.py. The number of repeats (the best time is reported) can be changed below.
+'''
+
+import time
+import pandas as pd
+from regionIndex import regionNames, loadRegionIndex
+from createRoutes import createRegionNetwork, regionDemands
+
+# number of times each engine is run for each region
+repeats = 3
+
+regionIndex = loadRegionIndex()
+demandsDF = pd.read_excel("WoolworthsDemands.xlsx")
+
+print("{:<8}{:>8}{:>18}{:>10}{:>20}{:>10}".format("Region", "Stores", "cycles time (s)", "routes", "capacity time (s)", "routes"))
+totals = {"cycles": [0, 0], "capacity": [0, 0]}
+for region in regionNames:
+    row = [region, regionIndex.size(region) - 1]
+    for engine in ["cycles", "capacity"]:
+        best = None
+        for repeat in range(repeats):
+            start = time.perf_counter()
+            network = createRegionNetwork(region, regionIndex.names(region), regionIndex.times(region), engine,
+                                          demands = regionDemands(regionIndex, demandsDF, region))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        row.extend([best, len(network.routes)])
+        totals[engine][0] += best
+        totals[engine][1] += len(network.routes)
+    print("{:<8}{:>8}{:>18.3f}{:>10}{:>20.3f}{:>10}".format(*row))
+
+print("{:<8}{:>8}{:>18.3f}{:>10}{:>20.3f}{:>10}".format("Total", "", *totals["cycles"], *totals["capacity"]))
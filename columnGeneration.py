@@ -0,0 +1,208 @@
+'''
+Generates routes by column generation instead of enumerating every route with createRoutes.py.
+
+Starting from the direct trips from the distribution centre to each store, the LP relaxation of the set partitioning model
+in formulation.py is solved and the dual value of each store's constraint is used to price new routes. For each region a
+label-setting search (an elementary shortest path with pallet and time limits) finds the routes with the most negative
+reduced cost (cost of the route minus the duals of its stores), which are added to the LP. This repeats until no region has
+a route with a negative reduced cost, so the LP over the generated routes has the same optimal value as the LP over every
+feasible route. The integer solve in formulation.py is then done over the generated routes.
+
+Routes are only limited by the pallet and time limits (and optionally a number of stores), not by the 5 nodes and k nearest
+neighbours used by createRoutes.py.
+'''
+
+import os
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+from regionIndex import regionNames
+from routeCosting import routeCost, hourlyCost, overtimeCost, unloadTime
+from routeCatalog import writeRouteCatalog
+
+def timeCost(time):
+    '''
+    Cost of a single route time in seconds, the same as routeCost but without numpy, as the pricing calls it for every label
+    '''
+    if time <= 4 * 3600:
+        return time / 3600 * hourlyCost
+    return hourlyCost * 4 + (time - 4 * 3600) / 3600 * overtimeCost
+
+class RoutePricer(object):
+    '''
+    Finds routes of one region with a negative reduced cost. Routes are kept as the list of the region's nodes visited in
+    order after leaving the distribution centre (node 0 is never in the list)
+    '''
+    def __init__(self, regionIndex, region, storeDemands, maxStores = None, maxPallets = 25, maxTime = 6*3600):
+        '''
+        Inputs:
+            regionIndex - RegionIndex giving the stores in each region and the travel times between them
+            region - name of the region
+            storeDemands - numpy array of the demand of every store
+            maxStores - maximum number of stores in a route, or None to only limit routes by pallets and time
+            maxPallets - pallet limit of a route
+            maxTime - time limit of a route in seconds, including unloading
+        '''
+        self.region = region
+        self.storeIndices = regionIndex.storeIndices[region]
+        self.maxStores = maxStores if maxStores is not None else len(self.storeIndices)
+        self.maxPallets = maxPallets
+        self.maxTime = maxTime
+
+        # puts the distribution centre first, so it is node 0 in the routes and the saved catalog
+        distr = np.flatnonzero(self.storeIndices == regionIndex.distrIndex)[0]
+        order = [distr] + [i for i in range(len(self.storeIndices)) if i != distr]
+        self.storeIndices = self.storeIndices[order]
+
+        # the 2 directions of each arc are averaged, the same as in routeCosting.py
+        times = np.asarray(regionIndex.travelTimes[np.ix_(self.storeIndices, self.storeIndices)], dtype = float)
+        self.times = (times + times.T) / 2
+        self.demands = np.asarray(storeDemands, dtype = float)[self.storeIndices]
+
+    def routeTime(self, route):
+        '''
+        Returns the total time (travel and unloading) of a route
+        '''
+        nodes = [0] + list(route) + [0]
+        return self.times[nodes[:-1], nodes[1:]].sum() + self.demands[list(route)].sum() * unloadTime
+
+    def routeEdges(self, route):
+        '''
+        Returns the (i, j) node pairs, with i < j, and the weight of a route in the form saved by routeCatalog.py
+        '''
+        if len(route) == 1:
+            return [(0, route[0])], 2
+        nodes = [0] + list(route) + [0]
+        return sorted((min(i, j), max(i, j)) for i, j in zip(nodes[:-1], nodes[1:])), 1
+
+    def price(self, duals, maxColumns = 20, tolerance = 1e-6):
+        '''
+        Returns up to maxColumns routes with the most negative reduced costs, most negative first
+
+        Inputs:
+            duals - numpy array of the dual value of every store's constraint, using the indices of the stores in
+                    WoolworthsTravelDurations.csv
+        Outputs:
+            list of (reduced cost, route) pairs
+        '''
+        storeDuals = np.asarray(duals, dtype = float)[self.storeIndices].tolist()
+        totalPositiveDuals = sum(max(dual, 0) for dual in storeDuals[1:])
+        times = self.times.tolist()
+        demands = self.demands.tolist()
+        numNodes = len(self.storeIndices)
+
+        # a label is a partial route leaving the distribution centre, stored as {(visited nodes as a bitset, last node):
+        # (travel time, pallets, sum of the duals, sum of the positive duals, route)}. Labels with the same visited nodes and
+        # last node only differ in their travel time, so only the quickest is kept. Each round extends every label by one store
+        labels = {}
+        for node in range(1, numNodes):
+            if demands[node] <= self.maxPallets:
+                labels[(1 << node, node)] = (times[0][node], demands[node], storeDuals[node], max(storeDuals[node], 0), (node,))
+
+        found = {}
+        while len(labels) > 0:
+            newLabels = {}
+            for (visited, node), (time, pallets, dualSum, positiveSum, route) in labels.items():
+                # returning to the distribution centre
+                totalTime = time + times[node][0] + pallets * unloadTime
+                if totalTime <= self.maxTime:
+                    reducedCost = timeCost(totalTime) - dualSum
+                    if reducedCost < -tolerance:
+                        key = frozenset(route)
+                        if key not in found or reducedCost < found[key][0]:
+                            found[key] = (reducedCost, route)
+
+                if len(route) == self.maxStores:
+                    continue
+
+                # the label can't lead to a negative reduced cost if collecting the duals of every store it hasn't visited
+                # still wouldn't pay for the time it has already used
+                if timeCost(time + pallets * unloadTime) - dualSum - (totalPositiveDuals - positiveSum) >= -tolerance:
+                    continue
+
+                for nextNode in range(1, numNodes):
+                    if visited & (1 << nextNode):
+                        continue
+                    nextPallets = pallets + demands[nextNode]
+                    nextTime = time + times[node][nextNode]
+                    # the route must still be able to get back within the time limit
+                    if nextPallets > self.maxPallets or nextTime + times[nextNode][0] + nextPallets * unloadTime > self.maxTime:
+                        continue
+                    key = (visited | (1 << nextNode), nextNode)
+                    if key not in newLabels or nextTime < newLabels[key][0]:
+                        newLabels[key] = (nextTime, nextPallets, dualSum + storeDuals[nextNode],
+                                          positiveSum + max(storeDuals[nextNode], 0), route + (nextNode,))
+            labels = newLabels
+
+        return sorted(found.values())[:maxColumns]
+
+def generateColumns(regionIndex, storeDemands, regions = regionNames, maxStores = None, maxPallets = 25, maxTime = 6*3600,
+                    maxColumns = 20, tolerance = 1e-6):
+    '''
+    Generates the routes of every region needed to solve the LP relaxation of the set partitioning model for one demand
+
+    Inputs: regionIndex: RegionIndex giving the stores in each region and the travel times between them
+            storeDemands: numpy array of the demand of every store
+            regions: names of the regions to generate routes for
+            maxStores, maxPallets, maxTime: limits on the routes (see RoutePricer)
+            maxColumns: maximum number of routes added for each region in each iteration
+            tolerance: smallest reduced cost treated as negative
+
+    Outputs: columns: dictionary of the list of routes (see RoutePricer) generated for each region
+             pricers: dictionary of the RoutePricer of each region
+             lpCost: optimal value of the LP relaxation
+    '''
+    pricers = {region: RoutePricer(regionIndex, region, storeDemands, maxStores, maxPallets, maxTime) for region in regions}
+    numStores = len(regionIndex.storeNames)
+    stores = np.array([j for j in range(numStores) if j != regionIndex.distrIndex])
+
+    # the direct trips to each store of a region are the starting routes, as enumerateRoutes adds them too
+    columns = {region: [(node,) for node in range(1, len(pricers[region].storeIndices))] for region in regions}
+    seen = {region: set(frozenset(route) for route in columns[region]) for region in regions}
+
+    while True:
+        regionOrder = [(region, route) for region in regions for route in columns[region]]
+        costs = np.array([float(routeCost(pricers[region].routeTime(route))) for region, route in regionOrder])
+        rows = [pricers[region].storeIndices[list(route)] for region, route in regionOrder]
+        storeIncidence = sparse.csr_matrix((np.ones(sum(len(r) for r in rows)),
+                                            (np.concatenate(rows), np.repeat(np.arange(len(rows)), [len(r) for r in rows]))),
+                                           shape = (numStores, len(rows)))
+
+        result = linprog(costs, A_eq = storeIncidence[stores], b_eq = np.ones(len(stores)), bounds = (0, None), method = "highs")
+        if not result.success:
+            raise RuntimeError("The LP relaxation could not be solved: " + result.message)
+        duals = np.zeros(numStores)
+        duals[stores] = result.eqlin.marginals
+
+        added = 0
+        for region in regions:
+            for reducedCost, route in pricers[region].price(duals, maxColumns, tolerance):
+                if frozenset(route) not in seen[region]:
+                    seen[region].add(frozenset(route))
+                    columns[region].append(route)
+                    added += 1
+        if added == 0:
+            return columns, pricers, result.fun
+
+def writeGeneratedRoutes(columns, pricers, regionIndex, folder = "generatedRoutes"):
+    '''
+    Saves the generated routes of each region to a .npz file in the format of routeCatalog.py, so they can be used by
+    formulation.py and readUsedRoutes.py in place of the routes from createRoutes.py
+
+    Inputs: columns: dictionary of the list of routes generated for each region
+            pricers: dictionary of the RoutePricer of each region
+            regionIndex: RegionIndex giving the names of the stores
+            folder: folder to save the .npz file of each region in. This is kept apart from regionRoutes, as the plans in
+                    usedRoutes refer to routes by their number in a catalog
+    '''
+    os.makedirs(folder, exist_ok = True)
+    for region, routes in columns.items():
+        pricer = pricers[region]
+        routeEdges = []
+        routeWeights = []
+        for route in routes:
+            edges, weight = pricer.routeEdges(route)
+            routeEdges.append(edges)
+            routeWeights.append(weight)
+        nodeNames = [regionIndex.storeNames[i] for i in pricer.storeIndices]
+        writeRouteCatalog(folder + "\\" + region + ".npz", region, nodeNames, pricer.storeIndices, routeEdges, routeWeights)
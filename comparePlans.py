@@ -0,0 +1,111 @@
+'''
+Compares the simulated cost of several route plans (files in the usedRoutes folder, eg. made with different pallet limits or
+route catalogs) using common random numbers: every plan is simulated with the same demands and traffic in each simulation,
+so the differences between plans aren't hidden by the noise between simulations.
+
+Two further variance reduction methods can be used:
+    --antithetic - each batch of draws is used together with its antithetic draws (mirrored demands and traffic), and each
+                   pair is averaged into one observation
+    --control-variate - each plan's cost is adjusted by the linear cost of its routes with the simulated demands and traffic
+                        (the deterministic cost used in formulation.py, which has a known expected value). See
+                        PlanSimulator.controlCosts
+
+The mean cost of each plan and the paired difference from the first plan are printed with their confidence intervals.
+'''
+
+import argparse
+import numpy as np
+from scipy import stats
+from routeCatalog import RouteCatalog
+from simulationEngine import PlanSimulator, drawSimulations, weekdayDemands, saturdayDemands
+
+def comparePlans(simulators, simulations, seed = None, antithetic = False, controlVariate = False, batchSize = 10000):
+    '''
+    Simulates several plans with common random numbers
+
+    Inputs: simulators: list of the PlanSimulator of each plan, all with the same demand model
+            simulations: number of simulations (including the antithetic ones). With antithetic draws an odd number is
+                         rounded up to the next even number, as the simulations are run in pairs
+            seed: seed of the random streams (an integer), or None for a new random seed
+            antithetic: whether to use antithetic draws
+            controlVariate: whether to adjust the costs by the control variate
+            batchSize: number of simulations drawn at once
+
+    Outputs: observations: (observations x plans) array of the (adjusted) costs, one row per simulation or antithetic pair
+             seed: seed used
+    '''
+    if antithetic:
+        # every batch is made of whole pairs
+        simulations += simulations % 2
+        batchSize += batchSize % 2
+
+    demandModel = simulators[0].demandModel
+    seedSequence = np.random.SeedSequence(seed)
+    sizes = [min(batchSize, simulations - start) for start in range(0, simulations, batchSize)]
+
+    costs = []
+    controls = []
+    for batchSeed, size in zip(seedSequence.spawn(len(sizes)), sizes):
+        rng = np.random.default_rng(batchSeed)
+        if antithetic:
+            draws = drawSimulations(demandModel, rng, size // 2)
+            batches = [draws, draws.antithetic(demandModel)]
+        else:
+            batches = [drawSimulations(demandModel, rng, size)]
+
+        # the observations of the batch are the averages over the antithetic pairs
+        costs.append(np.mean([np.column_stack([simulator.evaluate(draws).costs for simulator in simulators]) for draws in batches], axis = 0))
+        if controlVariate:
+            controls.append(np.mean([np.column_stack([simulator.controlCosts(draws) for simulator in simulators]) for draws in batches], axis = 0))
+
+    observations = np.concatenate(costs)
+    if controlVariate:
+        controls = np.concatenate(controls)
+        expected = np.array([simulator.expectedControlCost() for simulator in simulators])
+        for p in range(len(simulators)):
+            covariance = np.cov(observations[:, p], controls[:, p])
+            observations[:, p] -= covariance[0, 1] / covariance[1, 1] * (controls[:, p] - expected[p])
+    return observations, seedSequence.entropy
+
+def meanInterval(values, confidence = 0.95):
+    '''
+    Returns the mean of an array of values and the half-width of its confidence interval
+    '''
+    halfWidth = stats.t.ppf((1 + confidence) / 2, len(values) - 1) * np.std(values, ddof = 1) / np.sqrt(len(values))
+    return np.mean(values), halfWidth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compares the simulated costs of route plans with common random numbers")
+    parser.add_argument("plans", nargs = "+", help = "files of the route plans, eg. \"usedRoutes\\Average Weekday Demand.txt\"")
+    parser.add_argument("--folders", nargs = "*", default = None, help = "route catalog folder of each plan (regionRoutes if not given)")
+    parser.add_argument("--day", choices = ["weekday", "saturday"], default = "weekday", help = "demand distribution to simulate")
+    parser.add_argument("--simulations", type = int, default = 1000, help = "number of simulations (rounded up to an even number with --antithetic)")
+    parser.add_argument("--seed", type = int, default = None, help = "seed of the simulations")
+    parser.add_argument("--antithetic", action = "store_true", help = "use antithetic draws")
+    parser.add_argument("--control-variate", action = "store_true", help = "adjust the costs by the linear cost of the routes")
+    args = parser.parse_args()
+
+    folders = args.folders if args.folders else ["regionRoutes"] * len(args.plans)
+    if len(folders) != len(args.plans):
+        parser.error("a folder is needed for each plan")
+
+    demandModel = weekdayDemands() if args.day == "weekday" else saturdayDemands()
+    simulators = [PlanSimulator.fromUsedRoutes(plan, demandModel, RouteCatalog(folder)) for plan, folder in zip(args.plans, folders)]
+
+    observations, seed = comparePlans(simulators, args.simulations, args.seed, args.antithetic, args.control_variate)
+    print("Seed:", seed)
+    print("Simulations:", 2 * len(observations) if args.antithetic else len(observations))
+    print("Observations:", len(observations))
+
+    for p in range(len(args.plans)):
+        mean, halfWidth = meanInterval(observations[:, p])
+        print("{}: mean cost ${:.2f} +/- {:.2f}".format(args.plans[p], mean, halfWidth))
+
+    # paired differences from the first plan, and how much smaller their variance is than for independent simulations
+    for p in range(1, len(args.plans)):
+        differences = observations[:, p] - observations[:, 0]
+        mean, halfWidth = meanInterval(differences)
+        reduction = (np.var(observations[:, p], ddof = 1) + np.var(observations[:, 0], ddof = 1)) / np.var(differences, ddof = 1)
+        print("{} - {}: ${:.2f} +/- {:.2f} (variance {:.1f} times smaller than independent runs)".format(
+            args.plans[p], args.plans[0], mean, halfWidth, reduction))
@@ -1,54 +1,148 @@
 '''
-Script to be run to generate lists of all available routes given the network for the 
+Script to be run to generate lists of all available routes given the network for the
 Woolworths Distribution Problem split into certain regions
+
+Two route generation engines are available (chosen with --engine):
+    cycles - combines the fundamental cycles of a k nearest neighbour network (default)
+    capacity - lists every set of up to 4 stores within the pallet and time limits and uses the quickest tour through each
+
+The regions are independent, so with --workers above 1 each region's network and routes are created in its own process.
+The route files are still written in region order.
+
+Routes for the same set of stores in more than one region are then removed, keeping only the quickest (see routeIndex.py),
+unless --keep-duplicates is given.
 '''
 
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from NetworkAdjacencyMatrix import *
+from regionIndex import regionNames, loadRegionIndex
+from routeIndex import RouteIndex
+from routeCatalog import writeNetworkRoutes
 
-# import of data files for both the stores based on their individual regions and the travel times between stores
-locationsDF = pd.read_csv("WoolworthsByRegion.csv")
-travelDF = pd.read_csv("WoolworthsTravelDurations.csv")
+# days the routes are planned for, used by the capacity engine
+Days = ["Average Weekday Demand", "Average Saturday Demand"]
 
-# initialise a list to store the travel times between stores exclusively in their own regions
-RegionDFs = []
+def createRegionNetwork(region, nodeNames, travelTimes, engine = "cycles", k = 3, demands = None):
+    '''
+    Creates the network for a region and enumerates its routes
 
-# array to be used to iterate through each of the regions
-columns = ["C", "N", "E", "S", "W", "NW"]
+    Inputs:
+        region - name of the region
+        nodeNames - names of the nodes in the region
+        travelTimes - numpy array of travel times between the nodes in the region (from RegionIndex.times)
+        engine - route generation engine, either "cycles" or "capacity"
+        k - minimum number of neighbours of each store in the cycles engine
+        demands - array of the pallet demand of each node, needed by the capacity engine
+    Outputs:
+        network - NetworkByAdjacencyMatrix with its routes enumerated
+    '''
+    # initial creation of network objects.
+    network = NetworkByAdjacencyMatrix(region, len(nodeNames), nodeNames)
+    distributionIndex = nodeNames.index("Distribution Centre Auckland")
 
-# loops through regions, creating matrices of travel times between stores in each region 
-# (ie simplifying the original dataframe with all stores from all regions)
-for i in range(len(columns)):
-    RegionDFs.append(travelDF.drop(travelDF[locationsDF[columns[i]] == 0].index))
-    notRegion = travelDF["Store"][travelDF[locationsDF[columns[i]] == 0].index]
-    RegionDFs[i].drop(notRegion, axis=1, inplace=True)
-    RegionDFs[i].to_csv("regionTravelTimes\\" + columns[i] + ".csv", index=True)   # also stores these matrices as .csv files
+    if engine == "cycles":
+        # creates the networks adjacency matrix by creating links between each node to at least their nearest k neighbors. Also creates spanning tree of the network
+        network.addAdjacencies_and_createSpanningTree(travelTimes, distributionIndex, k = k)
 
-# initialise a list to network objects each of the individual regions
-RegionNetworks = []
+        # uses network's spanning tree to find a set of the networks fundamental cycles
+        network.findFundamentalCycles()
 
-# loops through regions, creating network objects for each of them
-for i in range(len(columns)):
+        # using the set of fundamental cycles enumerates all valid routes based on some assumptions
+        network.enumerateRoutes()
 
-    # initial creation of network objects.
-    network = NetworkByAdjacencyMatrix(columns[i], len(RegionDFs[i]), RegionDFs[i].Store.tolist())
+    elif engine == "capacity":
+        network.enumerateCapacitatedRoutes(travelTimes, distributionIndex, demands)
 
-    # creates the networks adjacency matrix by creating links between each node to at least their nearest k neighbors. Also creates spanning tree of the network
-    network.addAdjacencies_and_createSpanningTree(RegionDFs[i].drop("Store", axis=1), RegionDFs[i].columns.get_loc("Distribution Centre Auckland")-1, k = 3)
+    else:
+        raise ValueError("Unknown route generation engine: " + engine)
 
-    # adds region to list
-    RegionNetworks.append(network)
+    return network
 
-    # uses network's spanning tree to find a set of the networks fundamental cycles
-    RegionNetworks[i].findFundamentalCycles()
+def regionDemands(regionIndex, demandsDF, region):
+    '''
+    Returns the smallest demand of each node in a region over the days planned for, so the capacity engine's routes cover every day
 
-    # using the set of fundamental cycles enumerates all valid routes based on some assumptions
-    RegionNetworks[i].enumerateRoutes()
+    Inputs:
+        regionIndex - RegionIndex of the stores in each region
+        demandsDF - pandas dataframe of the store demands (WoolworthsDemands.xlsx)
+        region - name of the region
+    '''
+    return demandsDF.loc[regionIndex.storeIndices[region], Days].min(axis=1).to_numpy()
 
-    # saves each of the sets of routes to file
-    with open("{}.txt".format("regionRoutes\\" + columns[i]), "w") as outputFile:
-        for route in RegionNetworks[i].routes:
-            outputFile.write(repr(route))
-            outputFile.write("\n\n")
+def timedRegionNetwork(job):
+    '''
+    Runs createRegionNetwork for one region and times it. Used as the task for each worker process
+
+    Inputs:
+        job - tuple of the arguments to createRegionNetwork
+    Outputs:
+        network - NetworkByAdjacencyMatrix with its routes enumerated
+        elapsed - time taken in seconds
+    '''
+    start = time.perf_counter()
+    network = createRegionNetwork(*job)
+    return network, time.perf_counter() - start
+
+def writeRoutes(network, storeIndices):
+    '''
+    saves a network's set of routes to file (see routeCatalog.py for the format)
+
+    Inputs:
+        network - NetworkByAdjacencyMatrix with its routes enumerated
+        storeIndices - index of each of the network's nodes in WoolworthsTravelDurations.csv
+    '''
+    writeNetworkRoutes("regionRoutes\\" + network.name + ".npz", network, storeIndices)
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Generates the route files used by formulation.py")
+    parser.add_argument("--engine", choices = ["cycles", "capacity"], default = "cycles", help = "route generation engine")
+    parser.add_argument("-k", type = int, default = 3, help = "minimum number of neighbours of each store (cycles engine)")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes, 1 to create the regions one after another")
+    parser.add_argument("--keep-duplicates", action = "store_true", help = "keep routes for the same stores in more than one region")
+    parser.add_argument("--export-csv", action = "store_true", help = "also save the travel times of each region to the regionTravelTimes folder")
+    args = parser.parse_args()
+
+    # stores in each region and the travel times between stores
+    regionIndex = loadRegionIndex()
+    demandsDF = pd.read_excel("WoolworthsDemands.xlsx") if args.engine == "capacity" else None
+
+    if args.export_csv:
+        for region in regionNames:
+            regionIndex.exportCSV(region, "regionTravelTimes\\" + region + ".csv")
+
+    start = time.perf_counter()
+    jobs = []
+    for region in regionNames:
+        demands = regionDemands(regionIndex, demandsDF, region) if args.engine == "capacity" else None
+        jobs.append((region, regionIndex.names(region), regionIndex.times(region), args.engine, args.k, demands))
+
+    # creates network objects for each of the regions, in region order
+    RegionNetworks = []
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers = args.workers) as executor:
+            for network, elapsed in executor.map(timedRegionNetwork, jobs):
+                RegionNetworks.append(network)
+                print("Region {}: {} routes in {:.3f} s".format(network.name, len(network.routes), elapsed))
+    else:
+        for network, elapsed in map(timedRegionNetwork, jobs):
+            RegionNetworks.append(network)
+            print("Region {}: {} routes in {:.3f} s".format(network.name, len(network.routes), elapsed))
+
+    # removes routes repeated across regions
+    if not args.keep_duplicates:
+        index = RouteIndex(regionIndex.travelTimes)
+        for network in RegionNetworks:
+            index.addRegion(network, regionIndex.storeIndices[network.name])
+        for network in RegionNetworks:
+            index.filterNetwork(network)
+        print(index.summary())
+
+    # saves each of the sets of routes to file
+    for network in RegionNetworks:
+        writeRoutes(network, regionIndex.storeIndices[network.name])
+
+    print("Total time: {:.3f} s".format(time.perf_counter() - start))
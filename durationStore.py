@@ -0,0 +1,76 @@
+'''
+Loads the travel duration and distance matrices between stores.
+
+The first time a matrix is needed its .csv file is converted into a float32 binary file (.npy) beside it, with the store
+names saved in a second file. After that the binary file is memory-mapped instead of parsing the .csv, so every script and
+worker process that loads it shares the same pages of memory. The binary files are recreated whenever the .csv is newer.
+'''
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+def cacheNames(csvName):
+    '''
+    Returns the names of the binary files of a .csv file's matrix and store names
+    '''
+    base = os.path.splitext(csvName)[0]
+    return base + ".npy", base + "_stores.npy"
+
+def saveArray(fname, array):
+    '''
+    Saves an array to a .npy file by writing it under a temporary name unique to this process then renaming it, so other
+    processes never see part of a file even if several convert the same .csv at once
+    '''
+    handle, tempName = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(fname)), suffix = ".tmp.npy")
+    try:
+        with os.fdopen(handle, "wb") as tempFile:
+            np.save(tempFile, array)
+        os.replace(tempName, fname)
+    except BaseException:
+        os.remove(tempName)
+        raise
+
+def convertMatrix(csvName):
+    '''
+    Converts a .csv file of a matrix between stores (with the store names in the first column) into its binary files
+    '''
+    matrixName, storesName = cacheNames(csvName)
+    matrixDF = pd.read_csv(csvName)
+
+    saveArray(storesName, np.array(matrixDF.iloc[:, 0].tolist()))
+    saveArray(matrixName, matrixDF.iloc[:, 1:].to_numpy(dtype = np.float32))
+
+def isStale(fname, csvName):
+    '''
+    Returns whether a binary file is missing or older than its .csv file
+    '''
+    return not os.path.exists(fname) or os.path.getmtime(fname) < os.path.getmtime(csvName)
+
+def loadMatrix(csvName):
+    '''
+    Loads a matrix between stores, converting its .csv file first if needed
+
+    Inputs: csvName: String containing the name of the .csv file
+
+    Outputs: matrix: read-only memory-mapped float32 array
+             storeNames: list of the names of the stores, in the order of the rows and columns of matrix
+    '''
+    matrixName, storesName = cacheNames(csvName)
+    if isStale(matrixName, csvName) or isStale(storesName, csvName):
+        convertMatrix(csvName)
+
+    return np.load(matrixName, mmap_mode = "r"), np.load(storesName).tolist()
+
+def loadDurations():
+    '''
+    Loads the travel durations (in seconds) between all stores from WoolworthsTravelDurations.csv
+    '''
+    return loadMatrix("WoolworthsTravelDurations.csv")
+
+def loadDistances():
+    '''
+    Loads the distances between all stores from WoolworthsDistances.csv
+    '''
+    return loadMatrix("WoolworthsDistances.csv")
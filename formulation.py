@@ -1,99 +1,86 @@
+import argparse
 import numpy as np
 import pandas as pd
 from pulp import *
+from scipy.optimize import milp, LinearConstraint, Bounds
 
-from readRoutes import readRoutes
+from routeCatalog import loadRouteCatalog
+from regionIndex import regionNames, loadRegionIndex
+from routeCosting import RouteIncidence
+from columnGeneration import generateColumns, writeGeneratedRoutes
 
-def formulation(regions, sizes, day, regionDemands, distrIndex):
+def storeDemandVector(regions, regionIndex, day, regionDemands):
+    '''
+    Returns a numpy array of the demand of every store for the particular day, from the demands of each region
+    '''
+    storeDemands = np.zeros(len(regionIndex.storeNames))
+    for x in range(len(regions)):
+        storeDemands[regionIndex.storeIndices[regions[x]]] = regionDemands[x][day].to_numpy()
+    return storeDemands
+
+def formulation(regions, regionIndex, day, regionDemands, distrIndex, solver = "pulp", writeLP = True, filterRoutes = True,
+                catalogFolder = "regionRoutes"):
     '''
     Creates and solves lp models for the entire auckland region for 1 specific day of the week
 
     Inputs: regions: array containing strings of the region names
-            sizes: array containing integer of the size of each region
+            regionIndex: RegionIndex giving the stores in each region and the travel times between them
             day: array containing strings of the days of the week not including sunday
             regionDemands: array containing the demands for each region
             distrIndex: integer containing the index of the distribution centre.
-
-    Outputs: None
-             Prints out the Total cost of routes as well as the names of the routes used. 
-
-    Notes: The order of regions and sizes must be in the same order, ie the elements correspond to each other
+            solver: "pulp" to build the model with PuLP and solve it with CBC, or "highs" to build it from the sparse
+                    store x route matrix and solve it in-process with scipy's HiGHS solver (see solveHighs)
+            writeLP: whether to save the model as an .lp file (PuLP only)
+            filterRoutes: whether to leave out the routes over the time or pallet limits and the routes costing more than
+                          another route visiting the same stores before building the model. The number left out of each
+                          region is printed
+            catalogFolder: folder of the .npz route catalog of each region
+
+    Outputs: usedRoutes: sorted list of the names of the routes used (eg. "Routes_C_route18")
+             totalCost: Total cost of the routes used
+
+    Notes: The order of regions and regionDemands must be in the same order, ie the elements correspond to each other
     '''
-    #reading in the possible routes' adjacency matrices
-
-    # Create an array for the properties of each route for every route
-    routePalletsDemand = [] #total pallets demand for all stores in a route
-    routeTravelTime=[] #total time taken for each store in a route
-    routeCost = [] #total cost of the route
-    routeStoresCovered = [] #array for each route where a value of 1 is assigned if the corresponding store is in the route and 0 otherwise
-
-    allroutes = []
-
-    x = 0 #to keep track of the regions
-
-    for region in regions:
-        RouteNames = []
-        routes = readRoutes("regionRoutes\\" + region + ".txt", sizes[x])
-
-        #reading in the travel times between stores in the region
-        regionTravelTimes = np.genfromtxt("regionTravelTimes\\" + region + ".csv", delimiter = ",", skip_header = 1, usecols = range(2,sizes[x]+2))
-
-        regionNodeIndices = np.genfromtxt("regionTravelTimes\\" + region + ".csv", dtype = np.int8, delimiter = ",", skip_header = 1, usecols = 0)
-
-        #filtering out the demands for the particular day
-        demands = regionDemands[x][day]
-
-        #list of route names
-        RouteNames = [regions[x] + " route" + str(i) for i in range(len(routes))]
-        allroutes.extend(RouteNames)
-
-        #travel times for each route = summing up the elements in the product between the adjacency matrices and the regionTravelTimes 
-        #(element by element) and then dividing by 2
-
-
-        for route in routes:
-            #This results in an average for the 2 directions of the route which is acceptable as the difference is very small
-            travelTime = np.sum(np.multiply(route, regionTravelTimes))/2 
-            #unloading times
-            totalPalletsDemand = 0
-            stores = np.sum(route, axis = 1) #gives 0 for a row only if it is not within the route, 2 otherwise 
-            
-            stores2 = np.zeros(66)
-            for i in range(len(stores)):
-                stores2[regionNodeIndices[i]] = stores[i]
+    #reading in the possible routes of every region
+    catalogs = [loadRouteCatalog(catalogFolder + "\\" + region + ".npz") for region in regions]
+    routeSet = RouteIncidence(catalogs, len(regionIndex.storeNames))
+    allroutes = routeSet.names
+
+    #demand of every store for the particular day
+    storeDemands = storeDemandVector(regions, regionIndex, day, regionDemands)
+
+    #travel times, demands and costs of all routes at once (see routeCosting.py). The travel time of a route averages the 2
+    #directions of each arc, and the unloading time (7.5 minutes per pallet) is added to it
+    routeTravelTime, routePalletsDemand, routeCost = routeSet.totals(regionIndex.travelTimes, storeDemands)
+
+    #leaving out the routes that can't or shouldn't be used, so they don't become variables at all
+    if filterRoutes:
+        feasible, keep = routeSet.filterRoutes(routeTravelTime, routePalletsDemand, routeCost)
+        print(day + " routes:")
+        print(routeSet.filterCounts(feasible, keep))
+        allroutes = [allroutes[r] for r in np.flatnonzero(keep)]
+        routeTravelTime, routePalletsDemand, routeCost = routeTravelTime[keep], routePalletsDemand[keep], routeCost[keep]
+        storeIncidence = routeSet.storeIncidence[keep]
+    else:
+        storeIncidence = routeSet.storeIncidence
 
-            for i in range(sizes[x]):
-                if stores[i] != 0: #checking if the particular store is within the route
-                    totalPalletsDemand += demands.iloc[i] #returns the pallet demand for that store
-            
-            totalTime = travelTime+ totalPalletsDemand*7.5*60 #adding the travel time with the unloading time
-
-            #adding to the list of route information
-            routeTravelTime.append(totalTime)
-            routePalletsDemand.append(totalPalletsDemand)
-
-            #calculating rotue costs based on the time taken
-            if totalTime <= 4 * 3600:
-                routeCost.append((totalTime/3600)*225)
-            else:
-                routeCost.append(225*4 + ((totalTime-(4*3600))/3600)*275)
-
-            routeStoresCovered.append(stores2/2) # stores already assigns a value of 2 for each store visited and 0 otherwise
-        x += 1 #increment as we are moving on to the next region
-
-        
     #Dataframe creation
     RouteTime = pd.Series(routeTravelTime, index = allroutes)
     RouteDemand = pd.Series(routePalletsDemand, index = allroutes)
     RouteCost = pd.Series(routeCost, index=allroutes)
-    RouteStores = pd.Series(routeStoresCovered, index=allroutes)
-    
 
     RouteData = pd.DataFrame({'Cost': RouteCost,
                                     'Demand': RouteDemand,
-                                    'Time': RouteTime,
-                                    'Stores':RouteStores})
+                                    'Time': RouteTime})
+
+    #routes visiting each store, as the columns of the sparse (routes x stores) incidence matrix
+    RouteStores = storeIncidence.tocsc()
       
+    if solver == "highs":
+        return solveHighs(allroutes, routeCost, routeTravelTime, routePalletsDemand, storeIncidence, distrIndex)
+    elif solver != "pulp":
+        raise ValueError("Unknown solver: " + solver)
+
     #Forming the mixed-interger Program
     prob = LpProblem("Truck Scheduling and Efficiency for Woolworths NZ", LpMinimize)
     
@@ -103,83 +90,219 @@ def formulation(regions, sizes, day, regionDemands, distrIndex):
     #creating objective function
     prob += lpSum([RouteCost[i]*route_vars[i] for i in allroutes]) if lpSum(route_vars) <= 60 else lpSum([RouteCost[i]*route_vars[i] for i in allroutes]) + (lpSum(route_vars) - 60) * 2000
 
-    #adding constraints
-    for i in allroutes:
-        prob += RouteTime[i]*route_vars[i] <= 6*3600  # 6 hour time limit for routes
-        prob += RouteDemand[i]*route_vars[i] <= 25  # 26 pallets limit due to truck capacity, reduced to 25 to minimize final overall cost
-    for j in range(66):
+    #adding constraints (the time and pallet limits are already met by the filtered routes)
+    if not filterRoutes:
+        for i in allroutes:
+            prob += RouteTime[i]*route_vars[i] <= 6*3600  # 6 hour time limit for routes
+            prob += RouteDemand[i]*route_vars[i] <= 25  # 26 pallets limit due to truck capacity, reduced to 25 to minimize final overall cost
+    for j in range(len(regionIndex.storeNames)):
         if j != distrIndex:
-            prob += lpSum([RouteStores[i][j]*route_vars[i] for i in allroutes]) == 1 # each node is visited once and once only
+            prob += lpSum([route_vars[allroutes[r]] for r in RouteStores[:, j].indices]) == 1 # each node is visited once and once only
     
 
-    prob.writeLP("Routes_"+ day +".lp")
+    if writeLP:
+        prob.writeLP("Routes_"+ day +".lp")
     prob.solve(PULP_CBC_CMD(msg=0))
 
-    return prob.variables(), prob.objective
+    usedRoutes = sorted(v.name for v in prob.variables() if v.varValue > 0.5 and v.name != "__dummy")
+    return usedRoutes, value(prob.objective)
+
+def solveHighs(routeNames, routeCost, routeTime, routeDemand, storeIncidence, distrIndex, maxTime = 6*3600, maxPallets = 25):
+    '''
+    Builds the set partitioning model straight from the sparse (routes x stores) incidence matrix and solves it in-process with
+    scipy.optimize.milp (HiGHS). Routes over the time or pallet limit get an upper bound of 0 instead of extra constraints
+
+    Inputs: routeNames: list of the names of the routes (eg. "C route18")
+            routeCost, routeTime, routeDemand: numpy arrays of the cost, total time and pallet demand of each route
+            storeIncidence: sparse (routes x stores) matrix which is 1 where a route visits a store
+            distrIndex: integer containing the index of the distribution centre, which is not covered by a constraint
+            maxTime: 6 hour time limit for routes
+            maxPallets: 26 pallets limit due to truck capacity, reduced to 25 to minimize final overall cost
+
+    Outputs: usedRoutes: sorted list of the names of the routes used, named as PuLP would (eg. "Routes_C_route18")
+             totalCost: Total cost of the routes used
+    '''
+    # each store apart from the distribution centre is visited once and once only
+    stores = np.array([j for j in range(storeIncidence.shape[1]) if j != distrIndex])
+    coverConstraint = LinearConstraint(storeIncidence.T.tocsr()[stores], lb = 1, ub = 1)
 
+    feasible = (routeTime <= maxTime) & (routeDemand <= maxPallets)
+    result = milp(c = routeCost, constraints = coverConstraint, integrality = np.ones(len(routeNames)),
+                  bounds = Bounds(0, feasible.astype(float)))
+    if not result.success:
+        raise RuntimeError("HiGHS could not solve the model: " + result.message)
 
+    usedRoutes = sorted("Routes_" + routeNames[r].replace(" ", "_") for r in np.flatnonzero(result.x > 0.5))
+    return usedRoutes, result.fun
+
+class RouteSelectionModel(object):
+    '''
+    Set partitioning model over the routes of the regions, built once with PuLP and re-solved for any number of demand profiles.
+    Only the route costs and the upper bounds of the routes change between profiles (routes over the time or pallet limit, and
+    routes costing more than another route visiting the same stores, get an upper bound of 0), and each solve is warm-started
+    by CBC from the routes used by the previous one
+    '''
+    def __init__(self, regions, regionIndex, maxTime = 6*3600, maxPallets = 25, threads = None, catalogFolder = "regionRoutes",
+                 filterRoutes = True):
+        '''
+        Inputs:
+            regions - array containing strings of the region names
+            regionIndex - RegionIndex giving the stores in each region and the travel times between them
+            maxTime - 6 hour time limit for routes
+            maxPallets - 26 pallets limit due to truck capacity, reduced to 25 to minimize final overall cost
+            threads - number of threads CBC may use, or None for CBC's default
+            catalogFolder - folder of the .npz route catalog of each region
+            filterRoutes - whether to also leave out the routes costing more than another route visiting the same stores.
+                           Routes over the time or pallet limits are always left out, as the limits are the upper bounds
+        '''
+        self.regionIndex = regionIndex
+        self.filterRoutes = filterRoutes
+        self.threads = threads
+        self.maxTime = maxTime
+        self.maxPallets = maxPallets
+
+        catalogs = [loadRouteCatalog(catalogFolder + "\\" + region + ".npz") for region in regions]
+        self.routeSet = RouteIncidence(catalogs, len(regionIndex.storeNames))
+        self.routeVars = [LpVariable("Routes_" + name.replace(" ", "_"), cat = LpBinary) for name in self.routeSet.names]
+
+        self.prob = LpProblem("Truck Scheduling and Efficiency for Woolworths NZ", LpMinimize)
+        RouteStores = self.routeSet.storeIncidence.tocsc()
+        for j in range(len(regionIndex.storeNames)):
+            if j != regionIndex.distrIndex:
+                self.prob += lpSum([self.routeVars[r] for r in RouteStores[:, j].indices]) == 1 # each node is visited once and once only
+
+        self.previous = None
+
+    def solve(self, storeDemands, warmStart = True, lpName = None):
+        '''
+        Solves the model for one demand profile
+
+        Inputs: storeDemands: numpy array of the demand of every store
+                warmStart: whether to start CBC from the routes used by the previous solve, if they are still feasible
+                lpName: name of the .lp file to save the model to before solving, or None to not save it
+
+        Outputs: usedRoutes: sorted list of the names of the routes used (eg. "Routes_C_route18")
+                 totalCost: Total cost of the routes used
+        '''
+        routeTime, routeDemand, routeCost = self.routeSet.totals(self.regionIndex.travelTimes, storeDemands)
+        feasible, keep = self.routeSet.filterRoutes(routeTime, routeDemand, routeCost, self.maxTime, self.maxPallets)
+
+        if not self.filterRoutes:
+            keep = feasible
+
+        self.prob.setObjective(LpAffineExpression(zip(self.routeVars, routeCost)))
+        for var, routeKept in zip(self.routeVars, keep):
+            var.upBound = 1 if routeKept else 0
+
+        # the previous routes are only a useful start if all of them are still allowed with this demand
+        warmStart = warmStart and self.previous is not None and keep[self.previous].all()
+        if warmStart:
+            for var in self.routeVars:
+                var.setInitialValue(0)
+            for r in self.previous:
+                self.routeVars[r].setInitialValue(1)
+
+        if lpName is not None:
+            self.prob.writeLP(lpName)
+        self.prob.solve(PULP_CBC_CMD(msg = 0, warmStart = warmStart, threads = self.threads))
+        if LpStatus[self.prob.status] != "Optimal":
+            raise RuntimeError("CBC could not solve the model: " + LpStatus[self.prob.status])
+
+        self.previous = [r for r in range(len(self.routeVars)) if self.routeVars[r].varValue > 0.5]
+        return sorted(self.routeVars[r].name for r in self.previous), value(self.prob.objective)
+
+    def solveProfiles(self, profiles, warmStart = True, writeLP = False):
+        '''
+        Solves the model for each of a number of demand profiles in turn, each warm-started from the one before
+
+        Inputs: profiles: dictionary of the demand of every store (numpy array) for each profile name, eg. a day of the week
+                warmStart: whether to warm-start each solve from the one before
+                writeLP: whether to save the model of each profile as an .lp file, named as in formulation()
+
+        Output: dictionary of (usedRoutes, totalCost) for each profile name
+        '''
+        return {name: self.solve(storeDemands, warmStart, "Routes_" + name + ".lp" if writeLP else None)
+                for name, storeDemands in profiles.items()}
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = "Finds the cheapest set of routes for each day and saves them to the usedRoutes folder")
+    parser.add_argument("--solver", choices = ["pulp", "highs"], default = "pulp", help = "PuLP with CBC, or scipy's in-process HiGHS")
+    parser.add_argument("--no-lp", action = "store_true", help = "don't save the PuLP model as an .lp file")
+    parser.add_argument("--no-filter", action = "store_true", help = "include the routes over the limits and the dominated routes in the model")
+    parser.add_argument("--column-generation", action = "store_true",
+                        help = "generate the routes by column generation (see columnGeneration.py) and save them to the catalog folder instead of using the routes from createRoutes.py")
+    parser.add_argument("--catalog-folder", default = None,
+                        help = "folder of the route catalogs (generatedRoutes with --column-generation, otherwise regionRoutes)")
+    parser.add_argument("--max-stores", type = int, default = None, help = "maximum number of stores in a generated route")
+    parser.add_argument("--week", action = "store_true",
+                        help = "plan each operating day (Monday to Saturday) with one warm-started model (PuLP only) instead of the average weekday and Saturday")
+    args = parser.parse_args()
+    if args.week and args.solver != "pulp":
+        parser.error("--week only supports the PuLP solver")
+
+    #generated routes are kept apart from the routes of createRoutes.py, which other plans in usedRoutes refer to by number
+    if args.catalog_folder is None:
+        args.catalog_folder = "generatedRoutes" if args.column_generation else "regionRoutes"
+    #plans using a different catalog are saved under its name, so they aren't read with the regionRoutes catalogs
+    planPrefix = "" if args.catalog_folder == "regionRoutes" else args.catalog_folder + " "
+
     demands = pd.read_excel('WoolworthsDemands.xlsx')
-    woolworthsRegion = np.genfromtxt('WoolworthsByRegion.csv', delimiter = ',', skip_header = 1, usecols=(range(1,7)))
-
-    #list of nodes in Central region
-    regionCindex = []
-    regionEindex = []
-    regionNindex = []
-    regionNWindex = []
-    regionSindex = []
-    regionWindex = []
-
-
-    #Uses the WoolworthsByRegion file to split the data into the 6 regions (with some overlap)
-
-    #creating a list to store the names of nodes in each region
-    for i in range(66):
-        if woolworthsRegion[i,0] == 1:
-            regionCindex.append(i)
-        if woolworthsRegion[i,1] == 1:
-            regionNindex.append(i)
-        if woolworthsRegion[i,2] == 1:
-            regionEindex.append(i)
-        if woolworthsRegion[i,3] == 1:
-            regionSindex.append(i)
-        if woolworthsRegion[i,4] == 1:
-            regionWindex.append(i)
-        if woolworthsRegion[i,5] == 1:
-            regionNWindex.append(i)
-
-    #assigning/filtering the  demand for each region
-    demandsC = demands[demands.index.isin(regionCindex)]
-    demandsN = demands[demands.index.isin(regionNindex)]
-    demandsE = demands[demands.index.isin(regionEindex)]
-    demandsS = demands[demands.index.isin(regionSindex)]
-    demandsW = demands[demands.index.isin(regionWindex)]
-    demandsNW = demands[demands.index.isin(regionNWindex)]
+
+    #Uses the region index (from the WoolworthsByRegion file) to split the data into the 6 regions (with some overlap)
+    regionIndex = loadRegionIndex()
+
+    #assigning/filtering the demand for each region
+    regionDemands = [demands[demands.index.isin(regionIndex.storeIndices[region])] for region in regionNames]
+
+    if args.week:
+        Days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    else:
+        Days = ["Average Weekday Demand","Average Saturday Demand"]
+
+    #Generating the routes needed by each day, then saving the routes of all days together so both days use the same routes
+    if args.column_generation:
+        allColumns = {region: [] for region in regionNames}
+        for DAY in Days:
+            columns, pricers, lpCost = generateColumns(regionIndex, storeDemandVector(regionNames, regionIndex, DAY, regionDemands),
+                                                       maxStores = args.max_stores)
+            print(DAY + ": LP relaxation cost = $", lpCost, "using", sum(len(routes) for routes in columns.values()), "routes")
+            for region in regionNames:
+                storeSets = set(frozenset(route) for route in allColumns[region])
+                allColumns[region].extend(route for route in columns[region] if frozenset(route) not in storeSets)
+        writeGeneratedRoutes(allColumns, pricers, regionIndex, args.catalog_folder)
 
     #Formulating a solution for each day of the week
     outputs = []
     objectiveTotals = []
-    Days = ["Average Weekday Demand","Average Saturday Demand"]
-    for DAY in Days:
-        out, obj = formulation(["C", "N", "E", "S", "W", "NW"], [13, 10, 12, 15, 14, 11], DAY, [demandsC, demandsN, demandsE, demandsS, demandsW, demandsNW], 55)
-        outputs.append(out)
-        objectiveTotals.append(obj)
+    if args.week:
+        #the same model is re-solved for each day, as only the costs and feasible routes change
+        model = RouteSelectionModel(regionNames, regionIndex, catalogFolder = args.catalog_folder, filterRoutes = not args.no_filter)
+        profiles = {DAY: storeDemandVector(regionNames, regionIndex, DAY, regionDemands) for DAY in Days}
+        for out, obj in model.solveProfiles(profiles, writeLP = not args.no_lp).values():
+            outputs.append(out)
+            objectiveTotals.append(obj)
+    else:
+        for DAY in Days:
+            out, obj = formulation(regionNames, regionIndex, DAY, regionDemands, regionIndex.distrIndex, args.solver, not args.no_lp,
+                                   not args.no_filter, args.catalog_folder)
+            outputs.append(out)
+            objectiveTotals.append(obj)
 
     #printing out the results of the LP
 
-    #for viewing variable values
+    #for viewing the routes used
     for i in range(len(outputs)):
-        with open("{}.txt".format("usedRoutes\\" + Days[i]), "w") as outputFile:
+        with open("{}.txt".format("usedRoutes\\" + planPrefix + Days[i]), "w") as outputFile:
             print(Days[i] + ":")
-            print("Total Cost of Routes = $", value(objectiveTotals[i]))
+            print("Total Cost of Routes = $", objectiveTotals[i])
             print("The routes used are:")
-            for v in outputs[i]:
-                if v.varValue != 0 and v.name != "__dummy":
-                    print(v.name)
-                    outputFile.write(v.name + "\n")
-
+            for name in outputs[i]:
+                print(name)
+                outputFile.write(name + "\n")
 
-    print("Total Cost of Routes = $", value(objectiveTotals[0])*5 + value(objectiveTotals[1]))
 
+    if args.week:
+        print("Total Cost of Routes = $", sum(objectiveTotals))
+    else:
+        print("Total Cost of Routes = $", objectiveTotals[0]*5 + objectiveTotals[1])
@@ -1,64 +1,55 @@
-import numpy as np
-import pandas as pd
-from readRoutes import readRoutes
+from routeCatalog import RouteCatalog
 
-def readUsedRoutes(fname, arcs):
+def readUsedRouteNames(fname):
+    '''
+    Reads the names of the routes in a file in the usedRoutes folder (eg. "Routes_C_route18")
+
+    Inputs: fname: String containing the name of the file to be read
+
+    Output: list of (region, route number) pairs
+    '''
     with open(fname, 'r') as f:
         lines = f.readlines()
 
-    routeRegions = []
-    routeNums = []
+    usedRoutes = []
     for line in lines:
-        if line[7:9] == "NW":
-            routeRegions.append("NW")
-            routeNums.append(line[15:])
-        else:
-            routeRegions.append(line[7])
-            routeNums.append(line[14:])
-    
-    sizes = {'C': 13, 'N': 10, 'E': 12, 'S': 15, 'W': 14, 'NW': 11}
-    sizesSeries = pd.Series(data=sizes, index=["C", "N", "E", "S", "W", "NW"])
+        prefix, region, routeName = line.strip().split("_")
+        usedRoutes.append((region, int(routeName[len("route"):])))
+    return usedRoutes
 
-    outputRoutes = []
-    i = 0
-    arc = []
-    region_i = routeRegions[i]
-    while i < len(lines):
-        regionCurrent = routeRegions[i]
-        routes = readRoutes("regionRoutes\\" + regionCurrent + ".txt", sizesSeries.at[regionCurrent])
-        regionNodeIndices = np.genfromtxt("regionTravelTimes\\" + routeRegions[i] + ".csv", dtype = np.int8, delimiter = ",", skip_header = 1, usecols = 0)
-        while region_i == regionCurrent:
-            for j in range(len(routes[int(routeNums[i])])):
-                for k in range(j, len(routes[int(routeNums[i])])):
-                    if routes[int(routeNums[i])][j,k] != 0:
-                        arc.append((regionNodeIndices[j], regionNodeIndices[k]))
-            i+=1
-            outputRoutes.append(arc)
-            arc = []
-            try:
-                region_i = routeRegions[i]
-            except:
-                break
-    
+def readUsedRoutesArcsNodes(fname, catalog = None):
+    '''
+    Reads the routes in a file in the usedRoutes folder, finding both the arcs and the nodes of each route from a single read
+
+    Inputs: fname: String containing the name of the file to be read
+            catalog: RouteCatalog to take the routes from. A new one for the regionRoutes folder is used if not given
+
+    Outputs: arcs: list containing the list of (i, j) arcs of each route
+             nodes: list containing the list of nodes in each route
+    '''
+    if catalog is None:
+        catalog = RouteCatalog()
+
+    arcs = []
+    nodes = []
+    for region, r in readUsedRouteNames(fname):
+        routeArcs, routeNodes = catalog.route(region, r)
+        arcs.append(routeArcs)
+        nodes.append(routeNodes)
+    return arcs, nodes
+
+def readUsedRoutes(fname, arcs):
+    '''
+    Reads the routes in a file in the usedRoutes folder and returns either the arcs (arcs = True) or the nodes of each route
+    '''
+    routeArcs, routeNodes = readUsedRoutesArcsNodes(fname)
     if arcs:
-        return outputRoutes
+        return routeArcs
     else:
-        nodesUsed = []
-        for route in outputRoutes:
-            routeNodes = []
-            for arc in route:
-                for node in arc:
-                    if node in routeNodes:
-                        pass
-                    else:
-                        routeNodes.append(node)
-            nodesUsed.append(routeNodes)
-        return nodesUsed
+        return routeNodes
 
     
 if __name__ == "__main__":
     routes = readUsedRoutes("usedRoutes\\Average Weekday Demand.txt", False)
     for route in routes:
         print(route)
-
-
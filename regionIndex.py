@@ -0,0 +1,68 @@
+'''
+Index of the stores in each region, used in place of the per-region travel time files in the regionTravelTimes folder.
+
+The travel times between all stores are loaded once (memory-mapped, see durationStore.py), and the times between the stores of a region are taken from that
+matrix using the region's store indices (the row numbers in WoolworthsTravelDurations.csv).
+'''
+
+import numpy as np
+import pandas as pd
+from durationStore import loadDurations
+
+# names of the regions, in the order used throughout
+regionNames = ["C", "N", "E", "S", "W", "NW"]
+
+class RegionIndex(object):
+    '''
+    Store indices of each region and access to the travel times between the stores in a region
+    '''
+    def __init__(self, travelTimes, storeNames, regionsDF):
+        '''
+        Inputs:
+            travelTimes - numpy array of the travel times between all stores
+            storeNames - list of the names of all stores, in the order of travelTimes
+            regionsDF - pandas dataframe with a column for each region, which is 1 for the stores in that region (WoolworthsByRegion.csv)
+        '''
+        self.travelTimes = travelTimes
+        self.storeNames = storeNames
+        self.distrIndex = storeNames.index("Distribution Centre Auckland")
+        self.storeIndices = {}
+        for region in regionNames:
+            self.storeIndices[region] = np.flatnonzero(regionsDF[region].to_numpy() == 1)
+
+    def size(self, region):
+        '''
+        Returns the number of nodes (including the distribution center) in a region
+        '''
+        return len(self.storeIndices[region])
+
+    def names(self, region):
+        '''
+        Returns the names of the nodes in a region, in the order of its store indices
+        '''
+        return [self.storeNames[i] for i in self.storeIndices[region]]
+
+    def times(self, region):
+        '''
+        Returns the matrix of travel times between the nodes in a region. Indexing a subset of rows and columns makes numpy
+        copy them, so this is a small copy of the region's part of the full matrix rather than a view of it
+        '''
+        indices = self.storeIndices[region]
+        return self.travelTimes[np.ix_(indices, indices)]
+
+    def exportCSV(self, region, fname):
+        '''
+        Saves the travel times between the nodes in a region as a .csv file, in the format of the regionTravelTimes folder.
+        Not used by any of the scripts, but useful for checking the data
+        '''
+        regionDF = pd.DataFrame(self.times(region), index = self.storeIndices[region], columns = self.names(region))
+        regionDF.insert(0, "Store", self.names(region))
+        regionDF.to_csv(fname, index = True)
+
+def loadRegionIndex():
+    '''
+    Creates a RegionIndex from WoolworthsTravelDurations.csv and WoolworthsByRegion.csv
+    '''
+    travelTimes, storeNames = loadDurations()
+    regionsDF = pd.read_csv("WoolworthsByRegion.csv")
+    return RegionIndex(travelTimes, storeNames, regionsDF)
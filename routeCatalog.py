@@ -0,0 +1,168 @@
+'''
+Binary format for the route files in the regionRoutes folder, replacing the text files of printed adjacency matrices.
+
+Each region is saved as a .npz file containing:
+    region - name of the region
+    nodeNames - names of the nodes in the region, in the order used by the routes
+    storeIndices - index of each node in WoolworthsTravelDurations.csv
+    edges - (number of edges, 2) array of the (i, j) node pairs, with i < j, of every route one after another
+    offsets - the edges of route r are edges[offsets[r]:offsets[r+1]]
+    weights - number of times each edge of a route is travelled (2 for the direct routes to and from a store, 1 otherwise)
+
+RouteCatalog gives access to the routes of all regions by region and route number, only loading a region when it is first used.
+
+Running this script converts the text route files created by older versions of createRoutes.py into this format.
+'''
+
+from functools import lru_cache
+import numpy as np
+from readRoutes import readRoutes
+from regionIndex import regionNames, loadRegionIndex
+
+class RegionRoutes(object):
+    '''
+    Routes of one region loaded from a .npz file. The arrays are read once and routes are returned as views into them
+    '''
+    def __init__(self, fname):
+        with np.load(fname) as data:
+            self.region = str(data["region"])
+            self.nodeNames = data["nodeNames"].tolist()
+            self.storeIndices = data["storeIndices"]
+            self.edges = data["edges"]
+            self.offsets = data["offsets"]
+            self.weights = data["weights"]
+
+    def __len__(self):
+        return len(self.weights)
+
+    def routeEdges(self, r):
+        '''
+        Returns a view of the (i, j) node pairs of route r
+        '''
+        return self.edges[self.offsets[r]:self.offsets[r + 1]]
+
+    def routeMatrix(self, r):
+        '''
+        Returns the adjacency matrix of route r, in the same form as the matrices read by readRoutes
+        '''
+        matrix = np.zeros((len(self.nodeNames), len(self.nodeNames)))
+        edges = self.routeEdges(r)
+        matrix[edges[:, 0], edges[:, 1]] = self.weights[r]
+        matrix[edges[:, 1], edges[:, 0]] = self.weights[r]
+        return matrix
+
+class RouteCatalog(object):
+    '''
+    Routes of every region in a folder of .npz files. Regions are loaded the first time one of their routes is asked for and
+    kept in a least recently used cache, so using a few routes only costs loading their regions once
+    '''
+    def __init__(self, folder = "regionRoutes", maxRegions = 6):
+        '''
+        Inputs:
+            folder - folder containing the .npz file of each region
+            maxRegions - maximum number of regions kept loaded at once
+        '''
+        self.folder = folder
+        self.region = lru_cache(maxsize = maxRegions)(self.loadRegion)
+
+    def loadRegion(self, region):
+        '''
+        Loads the routes of a region from file. Use self.region instead, which caches the result
+        '''
+        return loadRouteCatalog(self.folder + "\\" + region + ".npz")
+
+    def weight(self, region, r):
+        '''
+        Returns the weight of route number r of a region: 2 for a direct trip, whose one arc is travelled there and back,
+        otherwise 1
+        '''
+        return int(self.region(region).weights[r])
+
+    def route(self, region, r):
+        '''
+        Returns the arcs and nodes of route number r of a region
+
+        Inputs:
+            region - name of the region
+            r - number of the route in the region
+        Outputs:
+            arcs - list of (i, j) pairs of the route's arcs, using the indices of the stores in WoolworthsTravelDurations.csv
+            nodes - list of the stores in the route, in the order they first appear in arcs
+        '''
+        routes = self.region(region)
+        arcs = [tuple(pair) for pair in routes.storeIndices[routes.routeEdges(r)].tolist()]
+        nodes = []
+        for arc in arcs:
+            for node in arc:
+                if node not in nodes:
+                    nodes.append(node)
+        return arcs, nodes
+
+def loadRouteCatalog(fname):
+    '''
+    Loads the routes of a region from a .npz file
+
+    Inputs: fname: String containing the name of the file to be read
+
+    Output: RegionRoutes object
+    '''
+    return RegionRoutes(fname)
+
+def writeRouteCatalog(fname, region, nodeNames, storeIndices, routeEdges, routeWeights):
+    '''
+    Saves the routes of a region to a .npz file
+
+    Inputs: fname: String containing the name of the file to be written
+            region: name of the region
+            nodeNames: list of the names of the nodes in the region
+            storeIndices: index of each node in WoolworthsTravelDurations.csv
+            routeEdges: list containing a list of (i, j) node pairs, with i < j, for each route
+            routeWeights: list containing the number of times each edge of a route is travelled
+    '''
+    offsets = np.zeros(len(routeEdges) + 1, dtype = np.int64)
+    offsets[1:] = np.cumsum([len(edges) for edges in routeEdges])
+    edges = np.zeros((offsets[-1], 2), dtype = np.int32)
+    for r in range(len(routeEdges)):
+        if len(routeEdges[r]) > 0:
+            edges[offsets[r]:offsets[r + 1]] = routeEdges[r]
+
+    np.savez(fname, region = region, nodeNames = np.array(nodeNames), storeIndices = np.asarray(storeIndices, dtype = np.int32),
+             edges = edges, offsets = offsets, weights = np.asarray(routeWeights, dtype = np.int8))
+
+def writeNetworkRoutes(fname, network, storeIndices):
+    '''
+    Saves the routes of a NetworkByAdjacencyMatrix to a .npz file
+
+    Inputs: fname: String containing the name of the file to be written
+            network: NetworkByAdjacencyMatrix with its routes enumerated
+            storeIndices: index of each of the network's nodes in WoolworthsTravelDurations.csv
+    '''
+    routeEdges = [network.edgePairs(route.edges) for route in network.routes]
+    routeWeights = [route.weight for route in network.routes]
+    writeRouteCatalog(fname, network.name, network.nodeNames, storeIndices, routeEdges, routeWeights)
+
+def convertTextCatalog(txtName, npzName, region, nodeNames, storeIndices):
+    '''
+    Converts a text route file (as read by readRoutes) into a .npz file
+
+    Inputs: txtName: String containing the name of the text file
+            npzName: String containing the name of the .npz file to be written
+            region: name of the region
+            nodeNames: list of the names of the nodes in the region
+            storeIndices: index of each node in WoolworthsTravelDurations.csv
+    '''
+    routeEdges = []
+    routeWeights = []
+    for route in readRoutes(txtName, len(nodeNames)):
+        rows, cols = np.nonzero(np.triu(route, 1))
+        routeEdges.append(list(zip(rows, cols)))
+        routeWeights.append(int(route.max()))
+    writeRouteCatalog(npzName, region, nodeNames, storeIndices, routeEdges, routeWeights)
+
+
+if __name__ == "__main__":
+    # converts the text route files of each region, using the region index for the node names and indices
+    regionIndex = loadRegionIndex()
+    for region in regionNames:
+        convertTextCatalog("regionRoutes\\" + region + ".txt", "regionRoutes\\" + region + ".npz", region,
+                           regionIndex.names(region), regionIndex.storeIndices[region])
@@ -0,0 +1,148 @@
+'''
+Costs many routes at once using sparse incidence matrices, instead of one route matrix at a time.
+
+A RouteIncidence holds the routes of one or more regions as:
+    arcIncidence - (routes x arcs) matrix of the number of times each route travels each arc
+    storeIncidence - (routes x stores) matrix which is 1 where a route visits a store
+so the travel times of all routes are arcIncidence @ (arc times) and their demands are storeIncidence @ (store demands).
+'''
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# cost per hour of a truck for the first 4 hours of a route, and for any time after that
+hourlyCost = 225
+overtimeCost = 275
+
+# time taken to unload each pallet in seconds
+unloadTime = 7.5 * 60
+
+def routeCost(times):
+    '''
+    Calculates the cost of routes based on the time taken (in seconds), which may be a number or a numpy array of any shape
+    '''
+    times = np.asarray(times, dtype = float)
+    return np.where(times <= 4 * 3600, (times / 3600) * hourlyCost, hourlyCost * 4 + ((times - 4 * 3600) / 3600) * overtimeCost)
+
+class RouteIncidence(object):
+    '''
+    Routes of one or more regions as sparse incidence matrices over arcs and stores, using the indices of the stores in
+    WoolworthsTravelDurations.csv
+    '''
+    def __init__(self, catalogs, numStores):
+        '''
+        Inputs:
+            catalogs - list of RegionRoutes (see routeCatalog.py) to include, in order
+            numStores - total number of stores (including the distribution center)
+        '''
+        self.numStores = numStores
+        self.names = []
+        self.regions = []
+
+        routeOffset = 0
+        routeRows = []
+        arcIds = []
+        arcWeights = []
+        for catalog in catalogs:
+            self.names.extend([catalog.region + " route" + str(r) for r in range(len(catalog))])
+            self.regions.extend([catalog.region] * len(catalog))
+
+            # row of the route each edge belongs to, and the edge as a pair of store indices
+            counts = np.diff(catalog.offsets)
+            routeRows.append(routeOffset + np.repeat(np.arange(len(catalog)), counts))
+            edges = catalog.storeIndices[catalog.edges]
+            arcIds.append(np.minimum(edges[:, 0], edges[:, 1]) * numStores + np.maximum(edges[:, 0], edges[:, 1]))
+            arcWeights.append(np.repeat(catalog.weights, counts))
+            routeOffset += len(catalog)
+
+        routeRows = np.concatenate(routeRows)
+        arcIds = np.concatenate(arcIds)
+        arcWeights = np.concatenate(arcWeights).astype(float)
+
+        # numbers the distinct arcs used by any route
+        arcIds, arcColumns = np.unique(arcIds, return_inverse = True)
+        self.arcs = np.column_stack((arcIds // numStores, arcIds % numStores))
+        self.arcIncidence = sparse.csr_matrix((arcWeights, (routeRows, arcColumns)), shape = (routeOffset, len(arcIds)))
+
+        # each route visits both ends of each of its arcs. Duplicates are summed by scipy, so the entries are reset to 1
+        storeRows = np.concatenate((routeRows, routeRows))
+        storeColumns = np.concatenate((self.arcs[arcColumns, 0], self.arcs[arcColumns, 1]))
+        self.storeIncidence = sparse.csr_matrix((np.ones(len(storeRows)), (storeRows, storeColumns)), shape = (routeOffset, numStores))
+        self.storeIncidence.data[:] = 1
+
+        # numbers the distinct sets of stores visited by the routes, so routes visiting the same stores have the same number
+        storeSets = {}
+        self.storeSetIds = np.array([storeSets.setdefault(tuple(np.sort(self.storeIncidence.indices[start:end])), len(storeSets))
+                                     for start, end in zip(self.storeIncidence.indptr[:-1], self.storeIncidence.indptr[1:])],
+                                    dtype = np.int64)
+        self.regions = np.array(self.regions)
+
+    def __len__(self):
+        return len(self.names)
+
+    def travelTimes(self, travelTimes):
+        '''
+        Returns the travel time of every route, averaging the 2 directions of each arc as the difference is very small
+
+        Inputs:
+            travelTimes - numpy array of the travel times between all stores
+        '''
+        arcTimes = (np.asarray(travelTimes[self.arcs[:, 0], self.arcs[:, 1]], dtype = float) +
+                    np.asarray(travelTimes[self.arcs[:, 1], self.arcs[:, 0]], dtype = float)) / 2
+        return self.arcIncidence @ arcTimes
+
+    def demands(self, storeDemands):
+        '''
+        Returns the total pallet demand of every route
+
+        Inputs:
+            storeDemands - numpy array of the demand of every store, or a (stores x scenarios) array to get a column per scenario
+        '''
+        return self.storeIncidence @ storeDemands
+
+    def totals(self, travelTimes, storeDemands):
+        '''
+        Returns the total time (travel and unloading), pallet demand and cost of every route
+
+        Inputs:
+            travelTimes - numpy array of the travel times between all stores
+            storeDemands - numpy array of the demand of every store
+        '''
+        pallets = self.demands(storeDemands)
+        totalTimes = self.travelTimes(travelTimes) + pallets * unloadTime
+        return totalTimes, pallets, routeCost(totalTimes)
+
+    def filterRoutes(self, totalTimes, pallets, costs, maxTime = 6*3600, maxPallets = 25):
+        '''
+        Finds the routes worth including in the model for one demand: routes within the time and pallet limits that are also the
+        cheapest of the routes visiting exactly the same stores (any other route visiting those stores is dominated by it)
+
+        Inputs:
+            totalTimes, pallets, costs - numpy arrays of the total time, pallet demand and cost of every route (see totals)
+            maxTime, maxPallets - limits on the routes
+        Outputs:
+            feasible - boolean array which is True for the routes within the limits
+            keep - boolean array which is True for the routes to include
+        '''
+        feasible = (totalTimes <= maxTime) & (pallets <= maxPallets)
+
+        # the first feasible route of each store set when sorted by cost
+        candidates = np.flatnonzero(feasible)
+        candidates = candidates[np.lexsort((costs[candidates], self.storeSetIds[candidates]))]
+        first = np.ones(len(candidates), dtype = bool)
+        first[1:] = self.storeSetIds[candidates[1:]] != self.storeSetIds[candidates[:-1]]
+
+        keep = np.zeros(len(self), dtype = bool)
+        keep[candidates[first]] = True
+        return feasible, keep
+
+    def filterCounts(self, feasible, keep):
+        '''
+        Returns a pandas dataframe of the number of routes of each region in total, over the limits, dominated and kept
+        '''
+        counts = pd.DataFrame({"Routes": pd.Series(self.regions).value_counts(sort = False),
+                               "Over limits": pd.Series(self.regions[~feasible]).value_counts(sort = False),
+                               "Dominated": pd.Series(self.regions[feasible & ~keep]).value_counts(sort = False),
+                               "Kept": pd.Series(self.regions[keep]).value_counts(sort = False)})
+        return counts.reindex(pd.unique(self.regions)).fillna(0).astype(int)
@@ -0,0 +1,82 @@
+'''
+Index of the routes of every region, used to remove routes that are repeated across regions.
+
+Stores in more than one region (eg. "Central/East") and the distribution centre appear in several region networks, so the
+same set of stores can be delivered to by a route from each of those regions. Only the quickest of these routes is needed
+in the Linear Program, as they have the same demand and cover the same stores.
+'''
+
+class RouteIndex(object):
+    '''
+    Keeps the quickest route for each set of stores (using their indices in WoolworthsTravelDurations.csv) across regions
+    '''
+    def __init__(self, travelTimes):
+        '''
+        Inputs:
+            travelTimes - numpy array of the travel times between all stores
+        '''
+        # time of each arc as used in the LP, which averages the 2 directions
+        self.times = (travelTimes + travelTimes.T) / 2
+
+        # maps the set of stores of a route to its travel time, region, position in that region and edge signature
+        self.best = {}
+
+        self.numRoutes = 0
+        self.exactDuplicates = 0
+        self.slowerRoutes = 0
+
+    def addRegion(self, network, globalIndices):
+        '''
+        Adds the routes of a region to the index. Where a set of stores has already been added, only the quicker route is kept.
+        When the travel times are the same, the route added first is kept
+
+        Inputs:
+            network - NetworkByAdjacencyMatrix with its routes enumerated
+            globalIndices - array of the index of each of the network's nodes in the travel times of all stores
+        '''
+        for position in range(len(network.routes)):
+            route = network.routes[position]
+            edges = [(globalIndices[i], globalIndices[j]) for i, j in network.edgePairs(route.edges)]
+
+            # canonical signatures of the route, which are the same for the route in any region
+            storeSet = frozenset(node for edge in edges for node in edge)
+            edgeSignature = (frozenset((min(i, j), max(i, j)) for i, j in edges), route.weight)
+            travelTime = route.weight * sum(self.times[i, j] for i, j in edges)
+
+            self.numRoutes += 1
+            if storeSet in self.best:
+                kept = self.best[storeSet]
+                if travelTime < kept[0]:
+                    self.countRemoved(edgeSignature == kept[3])
+                    self.best[storeSet] = (travelTime, network.name, position, edgeSignature)
+                else:
+                    self.countRemoved(edgeSignature == kept[3])
+            else:
+                self.best[storeSet] = (travelTime, network.name, position, edgeSignature)
+
+    def countRemoved(self, exact):
+        '''
+        Records a route being removed, either as an exact copy of the kept route or as a slower route for the same stores
+        '''
+        if exact:
+            self.exactDuplicates += 1
+        else:
+            self.slowerRoutes += 1
+
+    def filterNetwork(self, network):
+        '''
+        Removes the routes of a region which are not kept by the index, keeping the rest in order and renumbering them.
+        All regions must have been added first
+        '''
+        kept = set(position for travelTime, region, position, edgeSignature in self.best.values() if region == network.name)
+        network.routes = [network.routes[position] for position in range(len(network.routes)) if position in kept]
+        for i in range(len(network.routes)):
+            network.routes[i].name = network.name + " route" + str(i)
+
+    def summary(self):
+        '''
+        Returns a description of how many routes were removed
+        '''
+        removed = self.exactDuplicates + self.slowerRoutes
+        return "Removed {} of {} routes ({} exact duplicates, {} slower routes for the same stores), {} routes kept".format(
+            removed, self.numRoutes, self.exactDuplicates, self.slowerRoutes, len(self.best))
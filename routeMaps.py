@@ -0,0 +1,141 @@
+'''
+Draws the routes of any number of plans (files in the usedRoutes folder) on the map of Auckland and saves each as an image,
+without a display (matplotlib's Agg backend).
+
+The map image is downsampled and loaded once, and one figure is reused for every plan: only the route lines and title are
+replaced before each plan is saved. All the arcs of a plan are drawn as a single LineCollection, coloured by region, and the
+stores as a single scatter plot.
+'''
+
+import argparse
+import os
+from functools import lru_cache
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import numpy as np
+import pandas as pd
+from regionIndex import regionNames
+from routeCatalog import RouteCatalog
+from readUsedRoutes import readUsedRouteNames
+
+# colour of the routes of each region
+regionColours = dict(zip(regionNames, ["tab:red", "tab:blue", "tab:green", "tab:purple", "tab:orange", "tab:brown"]))
+
+@lru_cache(maxsize = 4)
+def loadBasemap(fname = "aucklandMap.PNG", maxWidth = 800):
+    '''
+    Returns the map image, keeping every n-th pixel so it is at most maxWidth pixels wide. The result is cached, so the image
+    is only read once
+    '''
+    image = plt.imread(fname)
+    step = max(1, int(np.ceil(image.shape[1] / maxWidth)))
+    return image[::step, ::step]
+
+def loadCoordinates(fname = "WoolworthsLocations.csv"):
+    '''
+    Returns a (stores x 2) array of the longitude and latitude of every store (in the order of WoolworthsTravelDurations.csv)
+    and the index of the distribution centre
+    '''
+    locations = pd.read_csv(fname)
+    return locations[["Long", "Lat"]].to_numpy(), locations.index[locations.Type == "Distribution Centre"][0]
+
+def planSegments(fname, catalog, coords):
+    '''
+    Returns the arcs of the routes in a usedRoutes file as a (arcs x 2 x 2) array of line segments and the colour of each
+    '''
+    segments = []
+    colours = []
+    for region, r in readUsedRouteNames(fname):
+        arcs, nodes = catalog.route(region, r)
+        segments.append(coords[np.array(arcs)])
+        colours.extend([regionColours[region]] * len(arcs))
+    return np.concatenate(segments) if segments else np.zeros((0, 2, 2)), colours
+
+class RouteMapRenderer(object):
+    '''
+    Figure of the map and stores, which the routes of each plan are drawn on in turn
+    '''
+    def __init__(self, coords, distrIndex, basemap = "aucklandMap.PNG", maxWidth = 800, size = (8, 8)):
+        '''
+        Inputs:
+            coords - (stores x 2) array of the longitude and latitude of every store
+            distrIndex - index of the distribution centre
+            basemap - file of the map image
+            maxWidth - largest width of the map image in pixels
+            size - size of the figure in inches
+        '''
+        self.coords = coords
+        self.fig, self.ax = plt.subplots(figsize = size)
+
+        # map extent, the same as plotLocations.py
+        BBox = (coords[:, 0].min(), coords[:, 0].max(), coords[:, 1].min(), coords[:, 1].max())
+        self.ax.imshow(loadBasemap(basemap, maxWidth), zorder = 0, extent = BBox, aspect = "equal")
+        self.ax.set_xlim(BBox[0], BBox[1])
+        self.ax.set_ylim(BBox[2], BBox[3])
+
+        self.routeLines = LineCollection([], linewidths = 1.5, zorder = 1)
+        self.ax.add_collection(self.routeLines)
+        stores = np.ones(len(coords), dtype = bool)
+        stores[distrIndex] = False
+        self.ax.scatter(coords[stores, 0], coords[stores, 1], s = 10, c = "k", zorder = 2)
+        self.ax.scatter(coords[distrIndex, 0], coords[distrIndex, 1], s = 60, c = "k", marker = "s", zorder = 2)
+
+        self.ax.legend(handles = [plt.Line2D([], [], color = colour, label = region) for region, colour in regionColours.items()],
+                       loc = "lower left", fontsize = 7)
+
+    def render(self, segments, colours, title, fname):
+        '''
+        Draws a plan's route lines in place of the previous plan's and saves the figure to fname (.png or .svg)
+        '''
+        self.routeLines.set_segments(segments)
+        self.routeLines.set_color(colours)
+        self.ax.set_title(title)
+        self.fig.savefig(fname, dpi = 150)
+
+    def close(self):
+        plt.close(self.fig)
+
+def renderPlans(planFiles, folder = "routeMaps", formats = ("png",), catalog = None):
+    '''
+    Saves a map of the routes of each plan
+
+    Inputs: planFiles: list of the names of the usedRoutes files of the plans
+            folder: folder the images are saved in, named after the plan files
+            formats: image formats to save each map in
+            catalog: RouteCatalog to take the routes from. A new one for the regionRoutes folder is used if not given
+
+    Output: list of the names of the files saved
+    '''
+    if catalog is None:
+        catalog = RouteCatalog()
+    os.makedirs(folder, exist_ok = True)
+    coords, distrIndex = loadCoordinates()
+    renderer = RouteMapRenderer(coords, distrIndex)
+
+    saved = []
+    try:
+        for planFile in planFiles:
+            segments, colours = planSegments(planFile, catalog, coords)
+            # usedRoutes files are named with Windows paths, eg. "usedRoutes\Average Weekday Demand.txt"
+            name = os.path.splitext(os.path.basename(planFile.replace("\\", "/")))[0]
+            for imageFormat in formats:
+                fname = folder + "\\" + name + "." + imageFormat
+                renderer.render(segments, colours, name, fname)
+                saved.append(fname)
+    finally:
+        renderer.close()
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Saves maps of the routes of plans in the usedRoutes folder")
+    parser.add_argument("plans", nargs = "*", default = ["usedRoutes\\Average Weekday Demand.txt", "usedRoutes\\Average Saturday Demand.txt"],
+                        help = "files of the route plans")
+    parser.add_argument("--folder", default = "routeMaps", help = "folder the images are saved in")
+    parser.add_argument("--formats", nargs = "+", choices = ["png", "svg"], default = ["png"], help = "image formats")
+    args = parser.parse_args()
+
+    for fname in renderPlans(args.plans, args.folder, args.formats):
+        print("Saved", fname)
@@ -0,0 +1,145 @@
+'''
+Re-plans the routes for many demand scenarios at once, solving each scenario's route selection model in a pool of worker
+processes.
+
+The scenarios are:
+    the average weekday and Saturday demands in WoolworthsDemands.xlsx
+    percentiles of each store's demand over the weekdays and Saturdays in WoolworthsDemands.xlsx (--percentiles)
+    random demands drawn the same way as the simulations, from weekdayDemands.csv (normal) and weekendDemands.csv
+    (uniform) (--draws of each, using --seed)
+
+Each worker builds one RouteSelectionModel (see formulation.py) when it starts and re-solves it for every scenario it is given,
+with CBC limited to 1 thread so the workers don't compete for cores. Results are written to the results file as each scenario
+finishes, one line per scenario with its cost and the routes used, so a long sweep can be checked while it runs.
+'''
+
+import argparse
+import csv
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from regionIndex import regionNames, loadRegionIndex
+from formulation import RouteSelectionModel
+
+# route selection model of a worker process, created by startWorker
+model = None
+
+def averageScenarios(demandsDF):
+    '''
+    Returns the average weekday and Saturday demands of every store as a dictionary of scenarios
+    '''
+    return {day: demandsDF[day].to_numpy(dtype = float) for day in ["Average Weekday Demand", "Average Saturday Demand"]}
+
+def percentileScenarios(demandsDF, percentiles):
+    '''
+    Returns the percentiles of every store's demand over the weekdays and over the Saturdays in the daily demands as a dictionary
+    of scenarios (eg. "Weekday p95")
+
+    Inputs: demandsDF: pandas dataframe of the store demands (WoolworthsDemands.xlsx)
+            percentiles: list of percentiles between 0 and 100
+    '''
+    dates = [column for column in demandsDF.columns if isinstance(column, datetime.datetime)]
+    dayTypes = {"Weekday": [date for date in dates if date.weekday() < 5],
+                "Saturday": [date for date in dates if date.weekday() == 5]}
+
+    scenarios = {}
+    for dayType, columns in dayTypes.items():
+        for percentile in percentiles:
+            scenarios["{} p{:g}".format(dayType, percentile)] = np.percentile(demandsDF[columns].to_numpy(dtype = float), percentile, axis = 1)
+    return scenarios
+
+def simulatedScenarios(numDraws, rng, distrIndex):
+    '''
+    Returns random demands for every store as a dictionary of scenarios ("Weekday draw 0", ..., "Saturday draw 0", ...). Weekday
+    demands are normally distributed using weekdayDemands.csv and Saturday demands uniformly distributed using weekendDemands.csv,
+    as in the simulations. Negative weekday draws are set to 0
+
+    Inputs: numDraws: number of scenarios drawn for each day
+            rng: numpy random Generator
+            distrIndex: integer containing the index of the distribution centre, which has no demand
+    '''
+    weekday = pd.read_csv("weekdayDemands.csv")
+    weekend = pd.read_csv("weekendDemands.csv")
+
+    weekdayDraws = np.maximum(rng.normal(weekday["mean"].to_numpy(), weekday["standard deviation"].to_numpy(),
+                                         size = (numDraws, len(weekday))), 0)
+    saturdayDraws = rng.uniform(weekend["min"].to_numpy(), weekend["max"].to_numpy(), size = (numDraws, len(weekend)))
+    weekdayDraws[:, distrIndex] = 0
+    saturdayDraws[:, distrIndex] = 0
+
+    scenarios = {}
+    for i in range(numDraws):
+        scenarios["Weekday draw " + str(i)] = weekdayDraws[i]
+    for i in range(numDraws):
+        scenarios["Saturday draw " + str(i)] = saturdayDraws[i]
+    return scenarios
+
+def startWorker():
+    '''
+    Builds the route selection model of a worker process, using a single CBC thread
+    '''
+    global model
+    model = RouteSelectionModel(regionNames, loadRegionIndex(), threads = 1)
+
+def solveScenario(job):
+    '''
+    Solves the route selection model for one scenario. Used as the task for each worker process
+
+    Inputs: job: tuple of the scenario name and the demand of every store
+
+    Outputs: name: name of the scenario
+             status: "Optimal", or the error if the scenario couldn't be solved
+             totalCost: Total cost of the routes used (None if not solved)
+             usedRoutes: sorted list of the names of the routes used
+             elapsed: time taken in seconds
+    '''
+    name, storeDemands = job
+    start = time.perf_counter()
+    try:
+        usedRoutes, totalCost = model.solve(storeDemands)
+        status = "Optimal"
+    except RuntimeError as error:
+        usedRoutes, totalCost, status = [], None, str(error)
+    return name, status, totalCost, usedRoutes, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Finds the cheapest set of routes for many demand scenarios")
+    parser.add_argument("--percentiles", type = float, nargs = "*", default = [50, 75, 95], help = "percentiles of the daily demands to plan for")
+    parser.add_argument("--draws", type = int, default = 100, help = "number of random weekday and Saturday demands to plan for")
+    parser.add_argument("--seed", type = int, default = None, help = "seed of the random demands")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes, 1 to solve the scenarios one after another")
+    parser.add_argument("--output", default = "scenarioResults.csv", help = "file the results are written to")
+    args = parser.parse_args()
+
+    demandsDF = pd.read_excel("WoolworthsDemands.xlsx")
+    regionIndex = loadRegionIndex()
+
+    scenarios = averageScenarios(demandsDF)
+    scenarios.update(percentileScenarios(demandsDF, args.percentiles))
+    scenarios.update(simulatedScenarios(args.draws, np.random.default_rng(args.seed), regionIndex.distrIndex))
+    jobs = list(scenarios.items())
+
+    start = time.perf_counter()
+    with open(args.output, "w", newline = "") as outputFile:
+        writer = csv.writer(outputFile)
+        writer.writerow(["Scenario", "Status", "Cost", "Time (s)", "Routes"])
+
+        def record(result):
+            name, status, totalCost, usedRoutes, elapsed = result
+            writer.writerow([name, status, totalCost, "{:.3f}".format(elapsed), " ".join(usedRoutes)])
+            outputFile.flush()
+            print("{}: {} ${} in {:.3f} s".format(name, status, totalCost, elapsed))
+
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers = args.workers, initializer = startWorker) as executor:
+                for future in as_completed([executor.submit(solveScenario, job) for job in jobs]):
+                    record(future.result())
+        else:
+            startWorker()
+            for job in jobs:
+                record(solveScenario(job))
+
+    print("{} scenarios in {:.3f} s".format(len(jobs), time.perf_counter() - start))
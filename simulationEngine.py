@@ -0,0 +1,514 @@
+'''
+Simulation engine shared by simulationWeekday.py and simulationSaturday.py, simulating many days of a set of routes at once.
+
+Each batch of simulations draws a (simulations x stores) matrix of store demands and of standard normal traffic values with a
+few numpy calls. The demand of every route in every simulation is then a single product with the sparse (routes x stores)
+matrix of the stores each route visits.
+
+Traffic multiplies the travel time of a route by a lognormal(0.2, 0.17) factor, as in the original scripts. The factor of a
+route is made from the traffic values of its stores (their sum divided by the square root of the number of stores), which is
+still a standard normal value. The routes of a plan never share a store, so each route's factor is independent, the same as
+drawing one per route. Because the values belong to the stores, plans with different routes can be simulated with the same
+draws. The extra truck sent to a store when a route is over capacity uses a second traffic value of that store.
+
+Simulations are run in fixed-size batches, and batch i always draws from the i-th random stream spawned from the run's seed
+(numpy SeedSequence). The batches can be shared between worker processes and are put back in order, so the results only
+depend on the seed and the batch size, not on the number of workers, and any run can be repeated exactly from its seed.
+
+PlanSimulator.run keeps every simulation's results, while PlanSimulator.summarise only keeps a SimulationSummary (see
+simulationStats.py) of them, so any number of simulations can be run in the same memory. PlanSimulator.summariseUntil keeps
+adding batches until the confidence interval of the mean cost (and optionally a quantile) is narrow enough. It checks after
+each batch in order, so it stops after the same batch whatever the number of workers.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from routeCosting import routeCost, hourlyCost, unloadTime
+from readUsedRoutes import readUsedRouteNames, readUsedRoutesArcsNodes
+from routeCatalog import RouteCatalog
+from durationStore import loadDurations
+from simulationStats import SimulationSummary
+
+# parameters of the lognormal distribution of the traffic factor
+trafficMean = 0.2
+trafficSigma = 0.17
+
+# pallets a truck can carry
+truckCapacity = 26
+
+# PlanSimulator of a worker process, set by startWorker
+workerSimulator = None
+
+class StoreDemands(object):
+    '''
+    Distribution of the demand of every store on one type of day
+    '''
+    def __init__(self, distribution, low, high, distrIndex = 55):
+        '''
+        Inputs:
+            distribution - "normal" (low and high are the means and standard deviations) or "uniform" (low and high are
+                           the minimums and maximums)
+            low, high - numpy arrays of the parameters of every store's demand
+            distrIndex - index of the distribution centre, which always has a demand of 0
+        '''
+        if distribution not in ["normal", "uniform"]:
+            raise ValueError("Unknown demand distribution: " + distribution)
+        self.distribution = distribution
+        self.low = np.asarray(low, dtype = float)
+        self.high = np.asarray(high, dtype = float)
+        self.distrIndex = distrIndex
+
+    def __len__(self):
+        return len(self.low)
+
+    def draw(self, rng, simulations):
+        '''
+        Returns a (simulations x stores) array of random demands
+
+        Inputs:
+            rng - numpy random Generator
+            simulations - number of simulations
+        '''
+        if self.distribution == "normal":
+            demands = rng.normal(self.low, self.high, size = (simulations, len(self)))
+        else:
+            demands = rng.uniform(self.low, self.high, size = (simulations, len(self)))
+        demands[:, self.distrIndex] = 0
+        return demands
+
+    def mean(self):
+        '''
+        Returns the expected demand of every store
+        '''
+        means = self.low if self.distribution == "normal" else (self.low + self.high) / 2
+        means = means.copy()
+        means[self.distrIndex] = 0
+        return means
+
+    def mirror(self, demands):
+        '''
+        Returns the antithetic demands of an array of demands (reflected about the mean of each store's distribution), which
+        have the same distribution but are negatively correlated with them
+        '''
+        return 2 * self.mean() - demands
+
+def weekdayDemands():
+    '''
+    Returns the normal distributions of the weekday demands in weekdayDemands.csv
+    '''
+    csv = pd.read_csv("weekdayDemands.csv")
+    return StoreDemands("normal", csv["mean"], csv["standard deviation"])
+
+def saturdayDemands():
+    '''
+    Returns the uniform distributions of the Saturday demands in weekendDemands.csv
+    '''
+    csv = pd.read_csv("weekendDemands.csv")
+    return StoreDemands("uniform", csv["min"], csv["max"])
+
+class SimulationDraws(object):
+    '''
+    Random values of a batch of simulations, which can be used to simulate any set of routes. Each array is (simulations x stores)
+    '''
+    def __init__(self, demands, trafficValues, extraValues):
+        '''
+        Inputs:
+            demands - demand of every store
+            trafficValues - standard normal traffic values of every store, for the traffic factors of the routes
+            extraValues - standard normal traffic values of every store, for the traffic factor of an extra truck
+        '''
+        self.demands = demands
+        self.trafficValues = trafficValues
+        self.extraValues = extraValues
+
+    def __len__(self):
+        return len(self.demands)
+
+    def antithetic(self, demandModel):
+        '''
+        Returns the antithetic draws, with mirrored demands and negated traffic values
+        '''
+        return SimulationDraws(demandModel.mirror(self.demands), -self.trafficValues, -self.extraValues)
+
+def drawSimulations(demandModel, rng, simulations):
+    '''
+    Draws the random values of a batch of simulations
+
+    Inputs:
+        demandModel - StoreDemands to draw the demands from
+        rng - numpy random Generator
+        simulations - number of simulations
+    Output:
+        SimulationDraws
+    '''
+    demands = demandModel.draw(rng, simulations)
+    trafficValues = rng.standard_normal((simulations, len(demandModel)))
+    extraValues = rng.standard_normal((simulations, len(demandModel)))
+    return SimulationDraws(demands, trafficValues, extraValues)
+
+class SimulationResults(object):
+    '''
+    Results of simulating a set of routes. Each array has a row for each simulation
+    '''
+    def __init__(self, costs, extraCosts, routeDemands, overcapacity, seed = None):
+        '''
+        Inputs:
+            costs - total cost of the routes including extra trucks
+            extraCosts - cost of the extra trucks
+            routeDemands - (simulations x routes) array of the demand of each route
+            overcapacity - number of extra trucks needed
+            seed - seed the simulations were drawn from, to repeat them
+        '''
+        self.costs = costs
+        self.extraCosts = extraCosts
+        self.routeDemands = routeDemands
+        self.overcapacity = overcapacity
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.costs)
+
+class PlanSimulator(object):
+    '''
+    Simulates the cost of a set of routes under random demands and traffic
+    '''
+    def __init__(self, routes, routeStores, travelTimes, demandModel, distrIndex = 55, weights = None):
+        '''
+        Inputs:
+            routes - list containing the list of (i, j) arcs of each route (see readUsedRoutes.py)
+            routeStores - list containing the list of nodes in each route
+            travelTimes - numpy array of the travel times between all stores
+            demandModel - StoreDemands to draw the demands from
+            distrIndex - index of the distribution centre
+            weights - weight of each route in its catalog (see RouteCatalog.weight). The arc of a weight 2 route (a direct
+                      trip) is travelled in both directions. All 1 if not given
+        '''
+        self.routes = routes
+        self.routeStores = routeStores
+        self.travelTimes = travelTimes
+        self.demandModel = demandModel
+        self.distrIndex = distrIndex
+        self.weights = np.ones(len(routes), dtype = np.int64) if weights is None else np.asarray(weights)
+
+        # travel time of each route without traffic, the sum of the travel times of its arcs
+        self.baseTimes = np.array([sum(self.arcTime(i, j, weight) for i, j in route) for route, weight in zip(routes, self.weights)])
+
+        # (routes x stores) matrix which is 1 where a route visits a store, leaving out the distribution centre
+        rows = [r for r in range(len(routeStores)) for store in routeStores[r] if store != distrIndex]
+        columns = [store for stores in routeStores for store in stores if store != distrIndex]
+        self.storeIncidence = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape = (len(routeStores), len(demandModel)))
+        self.storeCounts = np.asarray(self.storeIncidence.sum(axis = 1)).ravel()
+
+        # tables for costing the extra trucks of overloaded routes
+        self.buildRecourseTables()
+
+    @classmethod
+    def fromUsedRoutes(cls, fname, demandModel, catalog = None):
+        '''
+        Creates a PlanSimulator for the routes in a file in the usedRoutes folder, taken from catalog (a RouteCatalog of the
+        regionRoutes folder if not given)
+        '''
+        if catalog is None:
+            catalog = RouteCatalog()
+        routes, routeStores = readUsedRoutesArcsNodes(fname, catalog)
+        weights = [catalog.weight(region, r) for region, r in readUsedRouteNames(fname)]
+        travelTimes, storeNames = loadDurations()
+        return cls(routes, routeStores, travelTimes, demandModel, storeNames.index("Distribution Centre Auckland"), weights)
+
+    def arcTime(self, i, j, weight):
+        '''
+        Returns the travel time of arc (i, j) of a route with the given weight, including the trip back for weight 2
+        '''
+        time = float(self.travelTimes[i, j])
+        if weight == 2:
+            time += float(self.travelTimes[j, i])
+        return time
+
+    def trafficFactors(self, trafficValues):
+        '''
+        Returns the (simulations x routes) traffic factors of the routes from the (simulations x stores) traffic values
+        '''
+        routeValues = (self.storeIncidence @ trafficValues.T).T / np.sqrt(self.storeCounts)
+        return np.exp(trafficMean + trafficSigma * routeValues)
+
+    def buildRecourseTables(self):
+        '''
+        Builds the tables used to cost extra trucks, which only depend on the routes. For each route the stores are listed in
+        order of the time of their direct trip from the distribution centre, each with:
+            candidateStores - the store, or -1 after the route's last store
+            candidateDirectTimes - the time of the direct trip to the store and back
+            candidateBypassTimes - the change in the route's travel time when the store is left out, ie. the time of the
+                                   arc between its 2 neighbours less the times of its own arcs
+        '''
+        maxStores = int(self.storeCounts.max(initial = 0))
+        self.candidateStores = np.full((len(self.routes), maxStores), -1, dtype = np.int64)
+        self.candidateDirectTimes = np.zeros((len(self.routes), maxStores))
+        self.candidateBypassTimes = np.zeros((len(self.routes), maxStores))
+
+        for r in range(len(self.routes)):
+            route = self.routes[r]
+            weight = self.weights[r]
+            stores = [store for store in self.routeStores[r] if store != self.distrIndex]
+            directTimes = [float(self.travelTimes[store, self.distrIndex] + self.travelTimes[self.distrIndex, store]) for store in stores]
+            for k, (directTime, store) in enumerate(sorted(zip(directTimes, stores))):
+                bypassTime = 0
+                nodeConnected = []
+                for step in route:
+                    if store in step:
+                        bypassTime -= self.arcTime(step[0], step[1], weight)
+                        for s in step:
+                            if s != store:
+                                nodeConnected.append(s)
+                if len(nodeConnected) == 2:
+                    bypassTime += float(self.travelTimes[nodeConnected[0], nodeConnected[1]])
+
+                self.candidateStores[r, k] = store
+                self.candidateDirectTimes[r, k] = directTime
+                self.candidateBypassTimes[r, k] = bypassTime
+
+    def extraTimes(self, sims, routeNumbers, routeExtraDemands, demands, extraFactors):
+        '''
+        Calculates the extra time due to the total demand of routes exceeding the truck capacity, for any number of overloaded
+        routes at once. The store with the quickest direct trip that can take the extra demand is left out of the route and
+        visited by an extra truck instead. If no single store has that much demand the store with the largest demand is used
+
+        Inputs:
+            sims, routeNumbers - arrays of the simulation and route of each overloaded route
+            routeExtraDemands - array of the pallets over the truck capacity of each overloaded route
+            demands - (simulations x stores) array of the demand of every store
+            extraFactors - (simulations x stores) array of the traffic factor of the extra truck's trip to every store
+        '''
+        stores = self.candidateStores[routeNumbers]
+        candidateDemands = np.where(stores >= 0, demands[sims[:, None], stores], -np.inf)
+
+        # the first store (in order of direct trip time) with enough demand, otherwise the store with the largest demand
+        enough = candidateDemands > routeExtraDemands[:, None]
+        chosen = np.where(enough.any(axis = 1), enough.argmax(axis = 1), candidateDemands.argmax(axis = 1))
+
+        store = stores[np.arange(len(chosen)), chosen]
+        directTimes = self.candidateDirectTimes[routeNumbers, chosen]
+        bypassTimes = self.candidateBypassTimes[routeNumbers, chosen]
+        return directTimes * extraFactors[sims, store] + bypassTimes + routeExtraDemands * unloadTime
+
+    def controlCosts(self, draws):
+        '''
+        Returns the linear cost of the routes in each simulation: every hour charged at the normal rate and no extra trucks.
+        This is the deterministic cost of the routes with the simulated demands and traffic, and has a known expected value
+        (see expectedControlCost), so it can be used as a control variate
+        '''
+        routeDemands = (self.storeIncidence @ draws.demands.T).T
+        totalTimes = self.baseTimes * self.trafficFactors(draws.trafficValues) + routeDemands * unloadTime
+        return totalTimes.sum(axis = 1) * hourlyCost / 3600
+
+    def expectedControlCost(self):
+        '''
+        Returns the expected value of controlCosts, using the mean of the lognormal traffic factor and of the store demands
+        '''
+        meanFactor = np.exp(trafficMean + trafficSigma ** 2 / 2)
+        routeDemands = self.storeIncidence @ self.demandModel.mean()
+        return (self.baseTimes * meanFactor + routeDemands * unloadTime).sum() * hourlyCost / 3600
+
+    def simulate(self, rng, simulations):
+        '''
+        Simulates a batch of days
+
+        Inputs:
+            rng - numpy random Generator
+            simulations - number of simulations
+        Output:
+            SimulationResults
+        '''
+        return self.evaluate(drawSimulations(self.demandModel, rng, simulations))
+
+    def evaluate(self, draws):
+        '''
+        Simulates the routes with a batch of random values
+
+        Inputs:
+            draws - SimulationDraws
+        Output:
+            SimulationResults
+        '''
+        routeDemands, totalTimes, costs, extraCosts = self.routeOutcomes(draws)
+        extraCosts = extraCosts.sum(axis = 1)
+        return SimulationResults(costs.sum(axis = 1) + extraCosts, extraCosts, routeDemands, (routeDemands > truckCapacity).sum(axis = 1))
+
+    def routeOutcomes(self, draws):
+        '''
+        Simulates each route separately with a batch of random values
+
+        Inputs:
+            draws - SimulationDraws
+        Outputs (each a (simulations x routes) array):
+            routeDemands - demand of each route
+            totalTimes - total time of each route (travel with traffic and unloading)
+            costs - cost of each route's truck
+            extraCosts - cost of the extra truck of each route over capacity (0 for the other routes)
+        '''
+        demands = draws.demands
+        extraFactors = np.exp(trafficMean + trafficSigma * draws.extraValues)
+
+        routeDemands = (self.storeIncidence @ demands.T).T
+        totalTimes = self.baseTimes * self.trafficFactors(draws.trafficValues) + routeDemands * unloadTime
+        costs = routeCost(totalTimes)
+
+        # extra trucks for the routes over capacity
+        extraCosts = np.zeros(routeDemands.shape)
+        sims, routeNumbers = np.nonzero(routeDemands > truckCapacity)
+        extraTimes = self.extraTimes(sims, routeNumbers, routeDemands[sims, routeNumbers] - truckCapacity, demands, extraFactors)
+        extraCosts[sims, routeNumbers] = extraTimes * hourlyCost / 3600
+
+        return routeDemands, totalTimes, costs, extraCosts
+
+    def batchJobs(self, simulations, seedSequence, batchSize):
+        '''
+        Returns the (SeedSequence, number of simulations) of each batch of a run
+        '''
+        sizes = [min(batchSize, simulations - start) for start in range(0, simulations, batchSize)]
+        return list(zip(seedSequence.spawn(len(sizes)), sizes))
+
+    def summarise(self, simulations, seed = None, workers = 1, batchSize = 10000, binWidth = 1.0):
+        '''
+        Simulates any number of days, keeping only a summary of the results. Each batch (or each worker's batches) is summarised
+        where it is run and the summaries are merged in batch order
+
+        Inputs:
+            simulations, seed, workers, batchSize - as for run
+            binWidth - width of the histogram bins of the costs, in dollars
+        Output:
+            SimulationSummary, with the seed used
+        '''
+        seedSequence = np.random.SeedSequence(seed)
+        jobs = [(batchSeed, size, binWidth) for batchSeed, size in self.batchJobs(simulations, seedSequence, batchSize)]
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers = workers, initializer = startWorker, initargs = (self,)) as executor:
+                batches = executor.map(summariseBatch, jobs)
+                summary = self.mergeSummaries(batches, binWidth)
+        else:
+            startWorker(self)
+            summary = self.mergeSummaries(map(summariseBatch, jobs), binWidth)
+
+        summary.seed = seedSequence.entropy
+        return summary
+
+    def summariseUntil(self, halfWidth = None, relativePrecision = None, quantile = None, confidence = 0.95, maxSimulations = 1000000,
+                       minSimulations = 200, seed = None, workers = 1, batchSize = 1000, binWidth = 1.0):
+        '''
+        Simulates batches of days until the confidence intervals are narrow enough (see SimulationSummary.precise) or
+        maxSimulations have been run
+
+        Inputs:
+            halfWidth, relativePrecision, quantile, confidence - targets of the confidence intervals
+            maxSimulations - most simulations to run
+            minSimulations - fewest simulations to run before checking the targets
+            seed, workers, batchSize, binWidth - as for summarise. Each round runs a batch on every worker
+        Output:
+            SimulationSummary, with the seed used and whether the targets were met (converged)
+        '''
+        if halfWidth is None and relativePrecision is None:
+            raise ValueError("A target half-width or relative precision is needed")
+
+        seedSequence = np.random.SeedSequence(seed)
+        summary = SimulationSummary(len(self.routes), binWidth)
+        summary.seed = seedSequence.entropy
+        summary.converged = False
+
+        executor = ProcessPoolExecutor(max_workers = workers, initializer = startWorker, initargs = (self,)) if workers > 1 else None
+        if executor is None:
+            startWorker(self)
+        try:
+            while len(summary) < maxSimulations and not summary.converged:
+                remaining = maxSimulations - len(summary)
+                sizes = [min(batchSize, remaining - start) for start in range(0, min(remaining, batchSize * workers), batchSize)]
+                jobs = [(batchSeed, size, binWidth) for batchSeed, size in zip(seedSequence.spawn(len(sizes)), sizes)]
+                batches = executor.map(summariseBatch, jobs) if executor is not None else map(summariseBatch, jobs)
+
+                # later batches of the round are dropped once the targets are met
+                for batch in batches:
+                    summary.merge(batch)
+                    if len(summary) >= minSimulations and summary.precise(halfWidth, relativePrecision, quantile, confidence):
+                        summary.converged = True
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures = True)
+        return summary
+
+    def mergeSummaries(self, batches, binWidth):
+        '''
+        Merges the SimulationSummary of each batch, in order
+        '''
+        summary = SimulationSummary(len(self.routes), binWidth)
+        for batch in batches:
+            summary.merge(batch)
+        return summary
+
+    def run(self, simulations, seed = None, workers = 1, batchSize = 10000):
+        '''
+        Simulates any number of days, in batches so the memory used stays small
+
+        Inputs:
+            simulations - number of simulations
+            seed - seed of the random streams (an integer), or None for a new random seed
+            workers - number of worker processes, 1 to run the batches one after another
+            batchSize - number of simulations in each batch
+        Output:
+            SimulationResults, with the seed used
+        '''
+        seedSequence = np.random.SeedSequence(seed)
+        jobs = self.batchJobs(simulations, seedSequence, batchSize)
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers = workers, initializer = startWorker, initargs = (self,)) as executor:
+                batches = list(executor.map(simulateBatch, jobs))
+        else:
+            batches = [self.simulate(np.random.default_rng(batchSeed), size) for batchSeed, size in jobs]
+
+        return SimulationResults(np.concatenate([batch.costs for batch in batches]),
+                                 np.concatenate([batch.extraCosts for batch in batches]),
+                                 np.concatenate([batch.routeDemands for batch in batches]),
+                                 np.concatenate([batch.overcapacity for batch in batches]),
+                                 seedSequence.entropy)
+
+def startWorker(simulator):
+    '''
+    Keeps the PlanSimulator of a worker process, so it is only sent to each worker once
+    '''
+    global workerSimulator
+    workerSimulator = simulator
+
+def simulateBatch(job):
+    '''
+    Simulates one batch with the worker's PlanSimulator. Used as the task for each worker process
+
+    Inputs: job: tuple of the batch's SeedSequence and number of simulations
+    '''
+    batchSeed, size = job
+    return workerSimulator.simulate(np.random.default_rng(batchSeed), size)
+
+def summariseBatch(job):
+    '''
+    Simulates one batch with the worker's PlanSimulator and returns a SimulationSummary of it. Used as the task for each worker
+    process
+
+    Inputs: job: tuple of the batch's SeedSequence, number of simulations and histogram bin width
+    '''
+    batchSeed, size, binWidth = job
+    summary = SimulationSummary(len(workerSimulator.routes), binWidth)
+    summary.update(workerSimulator.simulate(np.random.default_rng(batchSeed), size), truckCapacity)
+    return summary
+
+def routeTotalsBatch(job):
+    '''
+    Simulates one batch with the worker's PlanSimulator and returns the totals over the batch of each route's demand, total
+    time, cost including its extra truck, and number of times over capacity. Used as the task for each worker process
+
+    Inputs: job: tuple of the batch's SeedSequence and number of simulations
+    '''
+    batchSeed, size = job
+    routeDemands, totalTimes, costs, extraCosts = workerSimulator.routeOutcomes(
+        drawSimulations(workerSimulator.demandModel, np.random.default_rng(batchSeed), size))
+    return routeDemands.sum(axis = 0), totalTimes.sum(axis = 0), (costs + extraCosts).sum(axis = 0), (routeDemands > truckCapacity).sum(axis = 0)
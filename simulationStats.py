@@ -0,0 +1,203 @@
+'''
+Streaming statistics for simulation output, so simulations can be summarised one batch at a time in a fixed amount of memory.
+
+RunningStats keeps the count, mean and sum of squared differences from the mean (Welford's method, combined between batches
+with Chan et al.'s formula). Histogram counts values in bins of a fixed width, which gives quantiles to within one bin width.
+Both can be merged with another of the same kind, so the summaries of batches run by different workers can be added together.
+'''
+
+import numpy as np
+from scipy import stats
+
+class RunningStats(object):
+    '''
+    Count, mean and variance of a stream of values, or of each element of a stream of arrays (eg. one value per route)
+    '''
+    def __init__(self, shape = ()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, values):
+        '''
+        Adds a batch of values, given as an array with a row for each value
+        '''
+        values = np.asarray(values, dtype = float)
+        if len(values) == 0:
+            return
+        batch = RunningStats(self.mean.shape)
+        batch.count = len(values)
+        batch.mean = values.mean(axis = 0)
+        batch.m2 = ((values - batch.mean) ** 2).sum(axis = 0)
+        self.merge(batch)
+
+    def merge(self, other):
+        '''
+        Adds the values of another RunningStats
+        '''
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+    def variance(self):
+        '''
+        Returns the sample variance
+        '''
+        return self.m2 / (self.count - 1) if self.count > 1 else np.full(self.mean.shape, np.nan)
+
+    def std(self):
+        '''
+        Returns the sample standard deviation
+        '''
+        return np.sqrt(self.variance())
+
+    def halfWidth(self, confidence = 0.95):
+        '''
+        Returns the half-width of the confidence interval for the mean
+        '''
+        return stats.t.ppf((1 + confidence) / 2, self.count - 1) * self.std() / np.sqrt(self.count)
+
+class Histogram(object):
+    '''
+    Counts of a stream of values in bins of a fixed width, starting at 0. Only the bins that have values are stored, so the
+    memory used depends on the range of the values and not on how many there are
+    '''
+    def __init__(self, binWidth = 1.0):
+        self.binWidth = binWidth
+        self.bins = {}
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        '''
+        Adds a batch of values
+        '''
+        values = np.asarray(values, dtype = float)
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        indices, counts = np.unique(np.floor(values / self.binWidth).astype(np.int64), return_counts = True)
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def merge(self, other):
+        '''
+        Adds the values of another Histogram with the same bin width
+        '''
+        if other.binWidth != self.binWidth:
+            raise ValueError("Histograms with different bin widths can't be merged")
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def counts(self):
+        '''
+        Returns the bin edges and counts of every bin from the lowest to the highest value, including empty bins
+        '''
+        low, high = min(self.bins), max(self.bins)
+        counts = np.zeros(high - low + 1, dtype = np.int64)
+        for index, count in self.bins.items():
+            counts[index - low] = count
+        return (np.arange(low, high + 2) * self.binWidth), counts
+
+    def quantile(self, q):
+        '''
+        Returns the q quantile (0 <= q <= 1), assuming the values in each bin are spread evenly across it (but within the
+        smallest and largest values)
+        '''
+        edges, counts = self.counts()
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        return float(np.clip(np.interp(q * cumulative[-1], cumulative, edges), self.min, self.max))
+
+    def quantileInterval(self, q, confidence = 0.95):
+        '''
+        Returns a confidence interval for the q quantile, from the values whose ranks are within the normal approximation of
+        the binomial distribution of the number of values below the quantile
+        '''
+        count = sum(self.bins.values())
+        spread = stats.norm.ppf((1 + confidence) / 2) * np.sqrt(q * (1 - q) / count)
+        return self.quantile(max(q - spread, 0)), self.quantile(min(q + spread, 1))
+
+    def rebin(self, numBins):
+        '''
+        Returns the edges and counts of numBins equal bins covering all the values, eg. for plotting
+        '''
+        edges, counts = self.counts()
+        newEdges = np.linspace(edges[0], edges[-1], numBins + 1)
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        return newEdges, np.diff(np.interp(newEdges, edges, cumulative))
+
+class SimulationSummary(object):
+    '''
+    Summary of any number of simulations of a set of routes (see simulationEngine.py)
+    '''
+    def __init__(self, numRoutes, binWidth = 1.0):
+        '''
+        Inputs:
+            numRoutes - number of routes in the plan
+            binWidth - width of the histogram bins of the costs, in dollars
+        '''
+        self.costs = RunningStats()
+        self.extraCosts = RunningStats()
+        self.overcapacity = RunningStats()
+        self.routeDemands = RunningStats(numRoutes)
+        self.routeOverloads = np.zeros(numRoutes, dtype = np.int64)
+        self.costHistogram = Histogram(binWidth)
+        self.extraCostHistogram = Histogram(binWidth)
+        self.seed = None
+        self.converged = None
+
+    def __len__(self):
+        return self.costs.count
+
+    def update(self, results, capacity = 26):
+        '''
+        Adds the SimulationResults of a batch
+        '''
+        self.costs.update(results.costs)
+        self.extraCosts.update(results.extraCosts)
+        self.overcapacity.update(results.overcapacity)
+        self.routeDemands.update(results.routeDemands)
+        self.routeOverloads += (results.routeDemands > capacity).sum(axis = 0)
+        self.costHistogram.update(results.costs)
+        self.extraCostHistogram.update(results.extraCosts)
+
+    def merge(self, other):
+        '''
+        Adds another SimulationSummary of the same routes
+        '''
+        self.costs.merge(other.costs)
+        self.extraCosts.merge(other.extraCosts)
+        self.overcapacity.merge(other.overcapacity)
+        self.routeDemands.merge(other.routeDemands)
+        self.routeOverloads += other.routeOverloads
+        self.costHistogram.merge(other.costHistogram)
+        self.extraCostHistogram.merge(other.extraCostHistogram)
+
+    def precise(self, halfWidth = None, relativePrecision = None, quantile = None, confidence = 0.95):
+        '''
+        Returns whether the confidence intervals are narrow enough
+
+        Inputs:
+            halfWidth - largest half-width of the confidence interval for the mean cost (in dollars), or None
+            relativePrecision - largest half-width as a fraction of the mean cost, or None
+            quantile - quantile of the cost (eg. 0.95) whose confidence interval must also meet the targets, or None
+            confidence - confidence level of the intervals
+        '''
+        intervals = [(self.costs.halfWidth(confidence), self.costs.mean)]
+        if quantile is not None:
+            low, high = self.costHistogram.quantileInterval(quantile, confidence)
+            intervals.append(((high - low) / 2, self.costHistogram.quantile(quantile)))
+
+        for width, estimate in intervals:
+            if halfWidth is not None and not width <= halfWidth:
+                return False
+            if relativePrecision is not None and not width <= relativePrecision * abs(estimate):
+                return False
+        return True
@@ -1,8 +1,5 @@
-import pandas as pd
-from scipy import stats
 import matplotlib.pyplot as plt
-import numpy as np
-from readUsedRoutes import readUsedRoutes
+from simulationEngine import PlanSimulator, weekdayDemands
 '''
 This script estimates the cost of satisfying actual pallet demands for every store on Weekdays by generating
 demands for each store and simulating the effects of traffic to determine to quality of the proposed trucking routes.
@@ -12,155 +9,55 @@ furfill excess demands, the extra costs associated with the extra trucks and the
 for each simulation and print out averages for the elements listed above as well as creat a histogram of the total
 costs across the simulatons
 
-Currently the script will run 1000 simulations which can be changed on line 98.
+Currently the script will run 1000 simulations which can be changed on line 20.
 
 '''
 
-def GenerateDemands():
-    '''
-    Generates the random demands for every store and stores them into a list
-
-    Inputs : None
-
-    Outputs :
-             StoreList: A list containing random demands for each store used in the route
-
-    Notes : None
-    '''   
-    StoreList = [] # Initialising an empty array
-    csv = pd.read_csv('weekdayDemands.csv') # Reads in CSV file with the respective min, max and mode values for each store required `
-    
-    # For loop to loop through all the possible routes and pick out the min, mode and max value for each store and store them into a list 'StoreList'
-
-    for i in range (0,len(csv)):
-        if i == 55:
-            StoreList.append(0)
-        else:
-            StoreList.append(np.random.normal(loc=csv.iloc[i]['mean'], scale=csv.iloc[i]['standard deviation']))# Generates random demands for each store using a normal distribution
-    return StoreList
-
-def trafficTravelTimes(routes, demands, allTravelTimes):
-    '''
-    given an array of the routes and their demands, returns an array of simulated corresponding route times with a traffic factor.
-    '''
-    
-    #We start with simulating the travel times
-    
-    #The travel times given no traffic drawing from the arcs read in and the matrix of travel durations given
-    noTrafficTimes = []
-    for route in routes:
-        routeTime = 0
-        for step in route:
-            routeTime += allTravelTimes[step[0],step[1]]
-        
-        noTrafficTimes.append(routeTime)
-    
-    #Uses the lognormal distribution to simulate a travel time for the route
-    trafficTimes = []
-    for i in range(len(noTrafficTimes)):
-        #converting non-traffic travel times
-        trafficTimes.append(noTrafficTimes[i] * np.random.lognormal(0.2,0.17)) #used a lognormal distribution to model the effects of traffic
-    
-    #the unloading times depends on the demand of the store on that day
-    unloadingTimes = np.array(demands) * 7.5 * 60
-
-    return np.add(trafficTimes, unloadingTimes)
-
-def routeExtraTime(routeStores, route, routeExtraDemand, simDemands, allTravelTimes):
-    #Calculates the extra costs due to the total demand of a route exceeeding 26 pallets
-    directTravelTimes = []
-    for store in routeStores:
-        storeDirectTravelTime = allTravelTimes[store, 55] + allTravelTimes[55, store]
-        directTravelTimes.append((storeDirectTravelTime, store))
-    for store in sorted(directTravelTimes, key=lambda tup: tup[0]):
-        if simDemands[store[1]] > routeExtraDemand:
-            extraTime = store[0]*np.random.lognormal(0.2,0.17) #using the same distribution used for traffic times earlier
-            nodeConnected = []
-            for step in route:
-                if store[1] in step:
-                    extraTime -= allTravelTimes[step[0],step[1]]
-                    for s in step:
-                        if s != store[1]:
-                            nodeConnected.append(s)
-            extraTime += allTravelTimes[nodeConnected[0],nodeConnected[1]]
-            break
-    extraTime += routeExtraDemand * 7.5
-    return extraTime
-
-# Creating an empty array accounting for the extra cost involved if demand exceeds 26 pallets
-extra_cost = []
-# Creating an empty array for the cost of the routes accounting for the effects of traffic and unloading times
-simulationCosts = []
-sim_route_demands = [] #for recording the demands of the routes
-sim_overcapacity = []   #for recording the overcapacity
-
 #The number of simulations to run
 simulations = 1000
-
-routes = readUsedRoutes("usedRoutes\\Average Weekday Demand.txt", True)
-routeStores = readUsedRoutes("usedRoutes\\Average Weekday Demand.txt",False)
-allTravelTimes = np.genfromtxt("WoolworthsTravelDurations.csv", delimiter = ",", skip_header = 1, usecols = range(1,67))
-
-
-for sim in range(simulations):
-    #generating random demands for each store
-    Run = GenerateDemands()
-    route_demands = []
-    for route in routeStores:
-        total_demand = 0
-        for i in range (len(route)):
-            if route[i] != 55:
-                total_demand += Run[route[i]] # summing the demands for the stores in the route
-        route_demands.append(total_demand) # recording the total demand for the route
-
-    #simulates the route times accounting for traffic and variations in unloading times
-    total_times = trafficTravelTimes(routes, route_demands, allTravelTimes)
-    
-    #calculates the cost of the route given the simulated times
-    routeCosts = []
-    for time in total_times:
-        if time <= 4 * 3600:
-            routeCosts.append((time/3600)*225)
-        else:
-            routeCosts.append(225*4 + ((time-(4*3600))/3600)*275)
-
-    overcapacity = 0 # created counter variable
-    demandExtraCosts = []
-    for i in range (len(route_demands)):
-        if route_demands[i]>26: # If demand exceeds 26, the counter which refers to how many extra trucks are needed increases
-            overcapacity+= 1    # increases the counter i.e the number of extra trucks required each time the demand is exceeded  
-            demandExtraCosts.append(routeExtraTime(routeStores[i], routes[i], route_demands[i]-26, Run, allTravelTimes) * 225/3600)
-    extra_cost.append(sum(demandExtraCosts))   # Adds the extra cost array
-
-    sim_route_demands.append(route_demands) #records the simulated demands
-    sim_overcapacity.append(overcapacity)
-
-    #records the cost of the entire set of routes including extra trucks
-    simulationCosts.append(np.sum(routeCosts)+extra_cost[-1])
+#The seed of the simulations (None for a random one, which is printed so the run can be repeated) and the number of processes to run them in
+seed = None
+workers = 1
+#For an adaptive number of simulations, set a target half-width (in dollars) or relative precision (eg. 0.001) of the 95% confidence
+#interval of the mean cost, and whether the 95th percentile of the cost must also meet it. Simulations are then run in batches until
+#the target is met, with the number above as the most that will be run
+targetHalfWidth = None
+targetRelativePrecision = None
+targetPercentile = False
+
+#simulates the routes with random demands and traffic (see simulationEngine.py)
+simulator = PlanSimulator.fromUsedRoutes("usedRoutes\\Average Weekday Demand.txt", weekdayDemands())
+#only a summary of the simulations is kept (see simulationStats.py), so the memory used is the same for any number of simulations
+if targetHalfWidth is not None or targetRelativePrecision is not None:
+    summary = simulator.summariseUntil(targetHalfWidth, targetRelativePrecision, 0.95 if targetPercentile else None,
+                                       maxSimulations = simulations, seed = seed, workers = workers)
+    print("Simulations used:", len(summary), "(target met)" if summary.converged else "(target not met)")
+else:
+    summary = simulator.summarise(simulations, seed, workers)
+print("Seed:", summary.seed)
 
 # Average completion time
 print("For Weekdays:")
-print("The mean extra cost from demand fluctuations: ",np.mean(extra_cost))
-print("The average demands for each route across simulations:\n", np.sum(sim_route_demands,axis = 0)/simulations)
-print("The average number of extra trucks required across simulations:", np.mean(sim_overcapacity))
+print("The mean extra cost from demand fluctuations: ",summary.extraCosts.mean)
+print("The average demands for each route across simulations:\n", summary.routeDemands.mean)
+print("The average number of extra trucks required across simulations:", summary.overcapacity.mean)
 
 #Average cost of routes
-print("The average cost of the routes",np.mean(simulationCosts))
+print("The average cost of the routes",summary.costs.mean)
 
-# Percentile interval
-extra_cost.sort()
-print("The percentile interval for extra cost: [",extra_cost[25], extra_cost[975], "]") 
+# Percentile interval (to within $1, the width of the histogram bins)
+print("The percentile interval for extra cost: [",summary.extraCostHistogram.quantile(0.025), summary.extraCostHistogram.quantile(0.975), "]") 
 
-simulationCosts.sort()
-print("The percentile interval for the total cost of routes [",simulationCosts[25], simulationCosts[975], "]")
+print("The percentile interval for the total cost of routes [",summary.costHistogram.quantile(0.025), summary.costHistogram.quantile(0.975), "]")
 
 #Plotting
 save_image = True #gives the option for the histogram to be saved or just shown
 plt.style.use('seaborn-whitegrid') # adds grid lines in the background
-plt.hist(simulationCosts, histtype='stepfilled', facecolor = '#2ab0ff', edgecolor='#169acf', linewidth=0.5,  alpha=0.5)
+binEdges, binCounts = summary.costHistogram.rebin(10)
+plt.hist(binEdges[:-1], bins = binEdges, weights = binCounts, histtype='stepfilled', facecolor = '#2ab0ff', edgecolor='#169acf', linewidth=0.5,  alpha=0.5)
 plt.title("Histogram of Generated Total Costs on a Weekday")
 plt.xlabel("Total Costs of Routes ($)")
-plt.ylabel("Frequency (out of 1000 simulations)")
+plt.ylabel("Frequency (out of {} simulations)".format(len(summary)))
 
 if save_image:
     plt.savefig("Cost_Weekday_simulations_final.png")
@@ -0,0 +1,106 @@
+'''
+Chooses the routes for a day by their expected cost over simulated demand and traffic scenarios (sample average approximation),
+instead of their cost with the average demands.
+
+Every route in the regionRoutes catalogs is simulated with the same S scenarios, drawn with the distributions used by the
+simulations (weekdayDemands.csv or weekendDemands.csv, see simulationEngine.py). The cost of a route in a scenario includes the
+extra truck needed when it goes over capacity. Because this cost only depends on the route itself, the expected cost of each
+route can be found before the model is built, in batches of scenarios that can be run in worker processes. The set
+partitioning model is then solved with the expected costs, leaving out routes whose expected time or demand is over the limits.
+'''
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from regionIndex import regionNames, loadRegionIndex
+from routeCatalog import RouteCatalog
+from readUsedRoutes import readUsedRouteNames
+from simulationEngine import PlanSimulator, startWorker, routeTotalsBatch, weekdayDemands, saturdayDemands, truckCapacity
+from formulation import solveHighs
+
+def catalogSimulator(catalog, regions, travelTimes, demandModel, distrIndex):
+    '''
+    Creates a PlanSimulator of every route in a RouteCatalog
+
+    Outputs: simulator: PlanSimulator of the routes, in region order
+             routeNames: list of the names of the routes (eg. "C route18")
+    '''
+    routes = []
+    routeStores = []
+    routeNames = []
+    weights = []
+    for region in regions:
+        for r in range(len(catalog.region(region))):
+            arcs, nodes = catalog.route(region, r)
+            routes.append(arcs)
+            routeStores.append(nodes)
+            weights.append(catalog.weight(region, r))
+            routeNames.append(region + " route" + str(r))
+    return PlanSimulator(routes, routeStores, travelTimes, demandModel, distrIndex, weights), routeNames
+
+def expectedRouteCosts(simulator, scenarios, seed = None, workers = 1, batchSize = 1000):
+    '''
+    Simulates every route of a PlanSimulator with the same scenarios and averages the results of each route
+
+    Inputs: simulator: PlanSimulator of the routes
+            scenarios: number of scenarios S
+            seed: seed of the scenarios (an integer), or None for a new random seed
+            workers: number of worker processes, 1 to run the batches one after another
+            batchSize: number of scenarios in each batch
+
+    Outputs: expectedCosts: expected cost of each route, including extra trucks
+             meanTimes: expected total time of each route
+             meanPallets: expected demand of each route
+             overloadRates: fraction of the scenarios in which each route is over capacity
+             seed: seed used
+    '''
+    seedSequence = np.random.SeedSequence(seed)
+    jobs = simulator.batchJobs(scenarios, seedSequence, batchSize)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers = workers, initializer = startWorker, initargs = (simulator,)) as executor:
+            batches = list(executor.map(routeTotalsBatch, jobs))
+    else:
+        startWorker(simulator)
+        batches = [routeTotalsBatch(job) for job in jobs]
+
+    pallets, times, costs, overloads = [np.sum(totals, axis = 0) for totals in zip(*batches)]
+    return costs / scenarios, times / scenarios, pallets / scenarios, overloads / scenarios, seedSequence.entropy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Finds the routes with the lowest expected cost over simulated scenarios")
+    parser.add_argument("--day", choices = ["weekday", "saturday"], default = "weekday", help = "demand distribution of the scenarios")
+    parser.add_argument("--scenarios", type = int, default = 500, help = "number of scenarios S")
+    parser.add_argument("--seed", type = int, default = None, help = "seed of the scenarios")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes")
+    args = parser.parse_args()
+
+    Day = "Average Weekday Demand" if args.day == "weekday" else "Average Saturday Demand"
+    demandModel = weekdayDemands() if args.day == "weekday" else saturdayDemands()
+
+    regionIndex = loadRegionIndex()
+    catalog = RouteCatalog()
+    simulator, routeNames = catalogSimulator(catalog, regionNames, regionIndex.travelTimes, demandModel, regionIndex.distrIndex)
+
+    expectedCosts, meanTimes, meanPallets, overloadRates, seed = expectedRouteCosts(simulator, args.scenarios, args.seed, args.workers)
+    print("Seed:", seed)
+
+    # the truck can carry 26 pallets, and the chance of going over is already in the expected costs
+    usedRoutes, totalCost = solveHighs(routeNames, expectedCosts, meanTimes, meanPallets, simulator.storeIncidence,
+                                       regionIndex.distrIndex, maxPallets = truckCapacity)
+    print("Expected cost of the routes = $", totalCost)
+
+    # the routes planned with the average demand, costed with the same scenarios
+    nameIndex = {name: r for r, name in enumerate(routeNames)}
+    if os.path.exists("usedRoutes\\" + Day + ".txt"):
+        averagePlan = [nameIndex[region + " route" + str(r)] for region, r in readUsedRouteNames("usedRoutes\\" + Day + ".txt")]
+        print("Expected cost of the routes planned for the", Day, "= $", expectedCosts[averagePlan].sum())
+
+    with open("usedRoutes\\Expected " + Day + ".txt", "w") as outputFile:
+        print("The routes used are:")
+        for name in usedRoutes:
+            r = nameIndex[name[len("Routes_"):].replace("_", " ")]
+            print(name, "(over capacity in {:.1%} of scenarios)".format(overloadRates[r]))
+            outputFile.write(name + "\n")